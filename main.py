@@ -1,20 +1,36 @@
-from pigui.ui.ui import Document, Frame
-from pigui.components.stats import StatApp
+from pigui.ui import Document, Frame
 from pigui.components.menu import Menu
-from pigui.components.camera import CameraApp
-from pigui.hardware.controller import Button, Joystick
-import time
 
-doc = Document()
 
-stat_frame = StatApp(doc).as_frame("stat")
-cam_frame = CameraApp(doc).as_frame("cam")
-menu = Menu(doc)
+def build_document(**kwargs) -> Document:
+    doc = Document(**kwargs)
 
-menu_frame = Frame(components=[menu], frame_name="menu")
+    # Apps are built the first time they're opened and evicted once idle, so their
+    # modules, buffers and hardware aren't held while the menu is showing
+    def stat_frame() -> Frame:
+        from pigui.components.stats import StatApp
 
+        return StatApp(doc).as_frame("stat")
 
-doc.pack_frame("menu", menu_frame)
-doc.pack_frame("stat", stat_frame)
-doc.pack_frame("camera", cam_frame)
-doc.main_loop(fps=False)
+    def cam_frame() -> Frame:
+        from pigui.components.camera import CameraApp
+
+        return CameraApp(doc).as_frame("camera")
+
+    def gallery_frame() -> Frame:
+        from pigui.components.gallery import Gallery
+
+        return Gallery(doc).as_frame("gallery")
+
+    menu = Menu(doc)
+    menu_frame = Frame(components=[menu], frame_name="menu")
+
+    doc.pack_frame("menu", menu_frame)
+    doc.pack_frame("stat", stat_frame)
+    doc.pack_frame("camera", cam_frame)
+    doc.pack_frame("gallery", gallery_frame)
+    return doc
+
+
+if __name__ == "__main__":
+    build_document().main_loop(fps=False)
@@ -1,6 +1,75 @@
+"""Game sprites as bool masks, loaded on first access.
+
+Sprites are read from a bit-packed sheet written by `python -m pigui.asset.build`
+and memory-mapped, so importing the package decodes nothing. Without a built sheet
+they fall back to decoding the sprite's `.ppm` with PIL. Access a sprite as a
+module attribute, e.g. `from pigui.asset import player`.
+"""
+
+import json
+import mmap
+import os
+from typing import Dict, Optional
 import numpy as np
-from PIL import Image
 
-player: np.ndarray = np.array(Image.open("pigui/asset/player.ppm"))
-coin: np.ndarray = np.array(Image.open("pigui/asset/coin.ppm"))
-block: np.ndarray = np.array(Image.open("pigui/asset/block.ppm"))
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))
+SHEET_FILE = os.path.join(ASSET_DIR, "sprites.bin")
+INDEX_FILE = os.path.join(ASSET_DIR, "sprites.json")
+
+_sheet: Optional[mmap.mmap] = None
+_index: Optional[Dict[str, dict]] = None
+_sprites: Dict[str, np.ndarray] = {}
+
+
+def sheet_index() -> Dict[str, dict]:
+    """`name`: `{"offset", "shape"}` of every sprite in the built sheet."""
+    global _index
+    if _index is None:
+        _index = {}
+        if os.path.exists(INDEX_FILE):
+            with open(INDEX_FILE) as f:
+                _index = json.load(f)
+    return _index
+
+
+def _sheet_bytes() -> mmap.mmap:
+    global _sheet
+    if _sheet is None:
+        with open(SHEET_FILE, "rb") as f:
+            _sheet = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return _sheet
+
+
+def load(name: str) -> np.ndarray:
+    """The (height, width) bool mask of sprite `name`, decoded once."""
+    if name in _sprites:
+        return _sprites[name]
+
+    entry = sheet_index().get(name)
+    if entry:
+        height, width = entry["shape"]
+        offset = entry["offset"]
+        packed = np.frombuffer(
+            _sheet_bytes(),
+            dtype=np.uint8,
+            count=(height * width + 7) // 8,
+            offset=offset,
+        )
+        pixels = np.unpackbits(packed, count=height * width, bitorder="little")
+        sprite = pixels.view(bool).reshape(height, width)
+    else:
+        path = os.path.join(ASSET_DIR, f"{name}.ppm")
+        if not os.path.exists(path):
+            raise AttributeError(f"No sprite named {name!r}")
+        from PIL import Image
+
+        sprite = np.array(Image.open(path).convert("1"))
+    sprite.flags.writeable = False
+    _sprites[name] = sprite
+    return sprite
+
+
+def __getattr__(name: str) -> np.ndarray:
+    if name.startswith("__"):
+        raise AttributeError(name)
+    return load(name)
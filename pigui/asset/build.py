@@ -0,0 +1,35 @@
+"""Pack the `.ppm` sprites of `pigui/asset` into one bit-packed sheet.
+
+    python -m pigui.asset.build
+
+Writes `sprites.bin`, the sprites' pixels bit-packed and concatenated, and
+`sprites.json`, the offset and shape of each one.
+"""
+
+import json
+import os
+import numpy as np
+from PIL import Image
+from pigui.asset import ASSET_DIR, INDEX_FILE, SHEET_FILE
+
+
+def build_sheet(directory=ASSET_DIR, sheet_path=SHEET_FILE, index_path=INDEX_FILE):
+    index = {}
+    with open(sheet_path, "wb") as sheet:
+        for file_name in sorted(os.listdir(directory)):
+            name, extension = os.path.splitext(file_name)
+            if extension != ".ppm":
+                continue
+            pixels = np.asarray(
+                Image.open(os.path.join(directory, file_name)).convert("1"), dtype=bool
+            )
+            index[name] = {"offset": sheet.tell(), "shape": list(pixels.shape)}
+            sheet.write(np.packbits(pixels, axis=None, bitorder="little").tobytes())
+    with open(index_path, "w") as f:
+        json.dump(index, f, indent=2)
+    return index
+
+
+if __name__ == "__main__":
+    for name, entry in build_sheet().items():
+        print(f"{name}: {entry['shape'][0]}x{entry['shape'][1]} at {entry['offset']}")
@@ -1,7 +1,10 @@
 import requests
 import json
+import traceback
 from dotenv import load_dotenv
-from typing import Generator
+from queue import Empty, Full, Queue
+from threading import Event, Thread
+from typing import Generator, Iterator, Tuple
 import os
 import random
 
@@ -58,3 +61,66 @@ def stream_chat_completion(prompt: str, test=True):
                     continue
 
             buffer = parts[-1]
+
+
+# Put on a `TokenStream` queue after the last token
+END_OF_STREAM = None
+
+
+class TokenStream:
+    """Drains a token generator on a background thread into a bounded queue.
+
+    The producer pulls tokens as fast as the source yields them, blocking once
+    `max_tokens` are waiting so an unread stream doesn't buffer without limit, and
+    puts `END_OF_STREAM` after the last one. Consumers take everything that arrived
+    at once with `drain`.
+    """
+
+    def __init__(self, tokens: Iterator[str], max_tokens=256):
+        self.tokens = tokens
+        self.queue: Queue = Queue(maxsize=max_tokens)
+        self.stopped = Event()
+        self.finished = False
+
+        self.thread = Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        try:
+            for token in self.tokens:
+                if not self.put(token):
+                    return
+        except Exception:
+            traceback.print_exc()
+        self.put(END_OF_STREAM)
+
+    def put(self, item) -> bool:
+        """Block while the queue is full. Returns False once the stream is stopped."""
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def drain(self) -> Tuple[str, bool]:
+        """All tokens received since the last call, joined, and whether the stream
+        has ended.
+        """
+        tokens = []
+        while not self.finished:
+            try:
+                token = self.queue.get_nowait()
+            except Empty:
+                break
+            if token is END_OF_STREAM:
+                self.finished = True
+            else:
+                tokens.append(token)
+        return "".join(tokens), self.finished
+
+    def stop(self):
+        """Stop producing; the source generator is abandoned where it is."""
+        self.stopped.set()
+        self.finished = True
@@ -1,74 +1,130 @@
-from pigui.hardware.camera import Camera, ImageProcessor
-from pigui.hardware.controller import Button, Joystick
-from pigui.ui import Component, Document, EventListener
+from pigui.hardware.camera import Camera, CaptureProgress, CaptureQueue, ImageProcessor
+from pigui.hardware.controller import Button, InputEvent, Joystick
+from pigui.ui import Component, Document, InputListener, State
 from pigui.components.still import Still
+from pigui.utils.photo_index import get_photo_index
 import time
 import os
+from threading import Lock, Thread
+from typing import Callable, Optional
 
 
 class CameraApp(Component):
-    def __init__(self, document: Document, image_directory="."):
+    def __init__(
+        self,
+        document: Document,
+        image_directory=".",
+        dither="bayer",
+        burst_size=5,
+        zsl=False,
+        camera_factory: Callable[..., Camera] = Camera,
+    ):
         super().__init__(document)
         self.camera = None
+        # Called as `camera_factory(zsl=...)` when the preview starts
+        self.camera_factory = camera_factory
+        # Zero shutter lag: save the frame nearest the press instead of a new exposure
+        self.zsl = zsl
+        self.capture_queue = None
+        # Finishes queued captures and turns the camera off after `close`
+        self.closing_thread: Optional[Thread] = None
+        # `close` runs on the input thread while `render` may be opening the camera
+        self.camera_lock = Lock()
         self.image_directory = image_directory
-        self.is_capturing_image = False
+        # Preview 1-bit conversion, one of `DITHER_MODES`
+        self.dither = dither
+        self.burst_size = burst_size
+        # Shared with the gallery; allocates names and keeps thumbnails
+        self.photo_index = get_photo_index(image_directory)
+
+        # Progress of the background capture pipeline
+        self.capture_state = State(CaptureProgress(0, 0))
+        self.capture_state.subscribe(self.on_capture_progress)
 
         # Return to menu page
-        return_listener = EventListener(
-            [(self.document.controller.joystick.on_up, self.close_cam)],
-            sleep=0.1,
-            debounce=0.5,
+        return_listener = InputListener(
+            [("joystick", "on_up", self.close_cam)], debounce=0.5
         )
-        # Capture image
-        capture_listener = EventListener(
-            [(self.document.controller.joystick.on_press, self.capture_img)],
-            sleep=0.1,
+        # Capture image, the button takes a burst
+        capture_listener = InputListener(
+            [
+                ("joystick", "on_press", self.capture_img),
+                ("button", "on_press", self.capture_burst),
+            ],
             debounce=0.5,
+            pass_event=True,
         )
         self.register_event_listener([return_listener, capture_listener])
 
     def close_cam(self):
         # Return to menu page
         self.document.goto_frame("menu")
+        self.close()
 
-        # Turn off camera
-        if self.camera:
-            self.camera.close()
-            self.camera = None
-            print("Camera closed.")
+    def close(self):
+        """Let queued captures finish, then turn off the camera, in the background so
+        input and rendering aren't held up while bursts are written.
+        """
+        with self.camera_lock:
+            capture_queue, camera = self.capture_queue, self.camera
+            self.capture_queue, self.camera = None, None
+            if camera is None:
+                return
+            self.closing_thread = Thread(
+                target=self.release_camera, args=(capture_queue, camera), daemon=True
+            )
+            self.closing_thread.start()
 
-    def capture_img(self):
-        if self.camera and not self.is_capturing_image:
-            self.is_capturing_image = True
+    @staticmethod
+    def release_camera(capture_queue: Optional[CaptureQueue], camera: Camera):
+        if capture_queue:
+            capture_queue.close()
+        camera.close()
+        print("Camera closed.")
 
-            img_name = self.get_image_name()
-            self.camera.capture_image(img_name)
-            print(f"Image {img_name} saved!")
+    def capture_img(self, event: Optional[InputEvent] = None, n=1):
+        # Read once, `close` may clear it meanwhile
+        capture_queue = self.capture_queue
+        if capture_queue is None:
+            return
+        img_names = [self.get_image_name() for _ in range(n)]
+        timestamp = event.timestamp if event else None
+        if not capture_queue.request(img_names, timestamp):
+            print("Capture queue full.")
 
-            self.is_capturing_image = False
+    def capture_burst(self, event: Optional[InputEvent] = None):
+        self.capture_img(event, self.burst_size)
+
+    def on_capture_progress(self, progress: CaptureProgress):
+        if progress.error:
+            print(f"Capture failed: {progress.error}")
+        elif progress.last_path:
+            print(f"Image {progress.last_path} saved!")
 
     def render(self):
-        if self.camera is None:
-            self.camera = Camera()
+        with self.camera_lock:
+            # Reopened before the previous session let go of the camera
+            if self.closing_thread and self.closing_thread.is_alive():
+                return Still.text("Saving images...")
+            if self.camera is None:
+                self.camera = self.camera_factory(zsl=self.zsl)
+                self.capture_queue = CaptureQueue(
+                    self.camera,
+                    self.capture_state.update,
+                    on_saved=self.photo_index.add,
+                )
+            camera = self.camera
 
         # Taking image
-        if self.is_capturing_image:
-            return Still.text("Saving image.....")
+        progress = self.capture_state.state
+        if progress.pending:
+            return Still.text(f"Saving image..... {progress.pending} left")
 
         # Previewing
-        try:
-            frame = next(self.camera.video_stream())
-            return ImageProcessor.load_img(frame.array)
-        except:
+        frame = camera.latest_frame()
+        if frame is None:
             return None
+        return ImageProcessor.dither(frame, self.dither)
 
-    def get_image_name(self, prefix="IMG"):
-        image_files = os.listdir(self.image_directory)
-        image_files = [f for f in image_files if f.startswith(prefix)]
-        image_num = (
-            0
-            if not image_files
-            else max([int(f.split(prefix)[1].split(".jpg")[0]) for f in image_files])
-        )
-        img_name = f"{prefix}{image_num + 1}.jpg"
-        return img_name
+    def get_image_name(self):
+        return self.photo_index.allocate_name()
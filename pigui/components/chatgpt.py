@@ -1,56 +1,63 @@
-from typing import List
-from PIL import Image, ImageDraw
-from pigui.components.api.chatgpt import stream_chat_completion
-from pigui.ui import Component, Document, EventListener
+from threading import Lock
+from PIL import Image
+from pigui.components.api.chatgpt import TokenStream, stream_chat_completion
+from pigui.ui import Component, Document, EventListener, InputListener
 from pigui.utils.constants import *
-from pigui.utils.text import format_text, format_tokens
+from pigui.utils.text import draw_text, format_text, format_tokens
 
 
 class ChatGPT(Component):
+    retained = True
+
     def __init__(self, document: Document):
         super().__init__(document)
         self.display_text = ""
         self.display_text_chunks = format_text(self.display_text)
         self.register_event_listener(
             [
-                EventListener([(True, self.update_display_text)], sleep=0.2),
+                # Scrolling repeats while the joystick is held, so it keeps polling
                 EventListener(
                     [
-                        (self.document.controller.joystick.on_up, self.on_scroll_up),
-                        (
-                            self.document.controller.joystick.on_right,
-                            self.on_scroll_down,
-                        ),
-                        (
-                            self.document.controller.joystick.on_press,
-                            self.update_prompt,
-                        ),
+                        ("joystick.on_up", self.on_scroll_up),
+                        ("joystick.on_right", self.on_scroll_down),
                     ],
                     sleep=0.1,
                 ),
+                InputListener([("joystick", "on_press", self.update_prompt)]),
             ],
         )
         self.prompt = "What is python?"
-        self.response_token_stream = stream_chat_completion(self.prompt)
+        # Tokens stream in on a background thread and are laid out once per frame
+        self.response_token_stream = TokenStream(stream_chat_completion(self.prompt))
         self.is_streaming = True
+        # Guards swapping the stream on input against draining it on render
+        self.stream_lock = Lock()
         self.line_pos = 0
 
+    def update(self):
+        self.update_display_text()
+
     def render(self):
         image = Image.new("1", (128, 64))
-        draw = ImageDraw.Draw(image)
 
         for ix, line in enumerate(
             self.display_text_chunks[self.line_pos : self.line_pos + text_lines]
         ):
-            draw.text((0, ix * text_line_height_px), line, fill=255)
+            draw_text(image, (0, ix * text_line_height_px), line)
 
         return image
 
     def update_display_text(self):
-        if not self.is_streaming:
-            return
-        try:
-            new_text = next(self.response_token_stream)
+        """Lay out every token that arrived since the previous frame in one pass."""
+        # Held throughout so a new prompt can't reset the text halfway
+        with self.stream_lock:
+            if not self.is_streaming:
+                return
+            new_text, finished = self.response_token_stream.drain()
+            if finished:
+                self.is_streaming = False
+            if not new_text:
+                return
             prev_line = self.display_text_chunks[-1] if self.display_text_chunks else ""
             lines = format_tokens(new_text, prev_line)
 
@@ -59,16 +66,28 @@ class ChatGPT(Component):
                 self.display_text_chunks.pop()
 
             self.display_text_chunks += lines
-        except StopIteration:
-            self.is_streaming = False
+        self.invalidate()
 
     def on_scroll_up(self):
         self.line_pos = max(0, self.line_pos - 1)
+        self.invalidate()
 
     def on_scroll_down(self):
         self.line_pos = min(len(self.display_text_chunks) - 4, self.line_pos + 1)
+        self.invalidate()
 
     def update_prompt(self):
         self.prompt = "Explain quantum physics like I'm 5"
-        self.response_token_stream = stream_chat_completion(self.prompt)
-        self.is_streaming = True
+        with self.stream_lock:
+            self.response_token_stream.stop()
+            self.response_token_stream = TokenStream(
+                stream_chat_completion(self.prompt)
+            )
+            self.is_streaming = True
+            # The new answer replaces the old one
+            self.display_text_chunks = format_text("")
+            self.line_pos = 0
+        self.invalidate()
+
+    def close(self):
+        self.response_token_stream.stop()
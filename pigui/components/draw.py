@@ -2,10 +2,12 @@ import time
 import numpy as np
 from PIL import Image
 from pigui.hardware.controller import Joystick
-from pigui.ui import Component, EventListener
+from pigui.ui import Component, EventListener, InputListener
 
 
 class DrawApp(Component):
+    retained = True
+
     def __init__(self, document):
         super().__init__(document)
         self.cursor_x, self.cursor_y = 128 // 2, 64 // 2
@@ -14,22 +16,30 @@ class DrawApp(Component):
         self.pixel = np.ones((64, 128), dtype=int)
         self.pixel.fill(255)
 
+        # Cursor movement repeats while the joystick is held, so it keeps polling
         evt_cb = [
-            (self.document.controller.joystick.on_up, self.cursor_on_up),
-            (self.document.controller.joystick.on_right, self.cursor_on_right),
-            (self.document.controller.joystick.on_press, self.save_drawing),
-            (self.document.controller.button.on_press, self.toggle_edit_mode),
+            ("joystick.on_up", self.cursor_on_up),
+            ("joystick.on_right", self.cursor_on_right),
+        ]
+        press_cb = [
+            ("joystick", "on_press", self.save_drawing),
+            ("button", "on_press", self.toggle_edit_mode),
         ]
 
-        self.register_event_listener(EventListener(evt_cb, sleep=0.05))
+        self.register_event_listener(
+            [EventListener(evt_cb, sleep=0.05), InputListener(press_cb)]
+        )
 
     def render(self):
-        return Image.fromarray(self.pixel).convert("1")
+        return self.pixel > 127
 
     def update_pixel(self):
         # Clear previous cursor
         if self.is_edit_mode:
             self.pixel[self.cursor_y][self.cursor_x] = 0
+            self.invalidate(
+                (self.cursor_x, self.cursor_y, self.cursor_x + 1, self.cursor_y + 1)
+            )
 
     def save_drawing(self):
         Image.fromarray(self.pixel).convert("1").save("Drawing.png")
@@ -0,0 +1,46 @@
+from pigui.ui import Component, Document, InputListener
+from pigui.components.still import Still
+from pigui.utils.photo_index import get_photo_index
+
+
+class Gallery(Component):
+    """Browse captured photos through the index's 1-bit thumbnail cache."""
+
+    retained = True
+
+    def __init__(self, document: Document, image_directory="."):
+        super().__init__(document)
+        self.photo_index = get_photo_index(image_directory)
+        # Position from the newest photo, 0 being the latest
+        self.offset = 0
+
+        self.register_event_listener(
+            InputListener(
+                [
+                    ("joystick", "on_up", self.prev_photo),
+                    ("joystick", "on_right", self.next_photo),
+                    ("joystick", "on_press", self.goto_frame_fn("menu")),
+                ],
+                debounce=0.1,
+            )
+        )
+
+    def render(self):
+        count = len(self.photo_index)
+        if not count:
+            return Still.text("No photos yet.")
+        self.offset = min(self.offset, count - 1)
+        thumbnail = self.photo_index.thumbnail(count - 1 - self.offset)
+        if thumbnail is None:
+            # Check again next frame
+            self.invalidate()
+            return Still.text("Loading...")
+        return thumbnail
+
+    def prev_photo(self):
+        self.offset = min(self.offset + 1, max(len(self.photo_index) - 1, 0))
+        self.invalidate()
+
+    def next_photo(self):
+        self.offset = max(self.offset - 1, 0)
+        self.invalidate()
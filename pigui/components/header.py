@@ -1,19 +1,38 @@
 from datetime import datetime
 from PIL import Image, ImageDraw
 from pigui.ui import Component
+from pigui.utils.text import draw_text
 
 
 class Header(Component):
-    def __init__(self, document, height):
-        super().__init__(document, height)
+    retained = True
+
+    def __init__(self, document, height=16):
+        super().__init__(document)
+        self.height = height
+        self.dt_string = None
+
+    def get_bounding_region(self):
+        return (0, 0, 128, self.height)
+
+    def take_dirty_regions(self):
+        # Only redraw when the clock text changes
+        dt_string = datetime.now().strftime("%H:%M:%S   %d-%b")
+        if dt_string != self.dt_string:
+            self.dt_string = dt_string
+            self.invalidate()
+        return super().take_dirty_regions()
 
     def render(self):
-        image = Image.new("1", (128, 64))
+        image = Image.new("1", (128, self.height))
         draw = ImageDraw.Draw(image)
 
-        draw.rectangle((0, 0, 128, 16), fill=255)
-        dt_string = datetime.now().strftime("%H:%M:%S   %d-%b")
-        draw.text(
-            (3, 1), f"PiOS    {dt_string}", font=self.document.font.resize(10), fill=0
+        draw.rectangle((0, 0, 128, self.height), fill=255)
+        draw_text(
+            image,
+            (3, 1),
+            f"PiOS    {self.dt_string}",
+            font=self.document.font.resize(10),
+            fill=0,
         )
         return image
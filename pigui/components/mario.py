@@ -1,26 +1,27 @@
 import random
 import numpy as np
-from PIL import Image, ImageDraw
-from pigui.ui import Component, EventListener
+from pigui.ui import Component, FixedTimestep, InputListener
 from pigui.utils.constants import *
-from pigui.asset import player, coin, block
-from abc import ABC, abstractmethod
-from enum import Enum, auto
+from pigui.utils.sprite import FrameBuffer, Sprite
+from pigui.utils.text import get_atlas
+from pigui.utils.tilemap import Parallax
+from collections import Counter
+from enum import IntEnum, auto
+from typing import Optional
 
 
 class Player:
-    def __init__(self, x, y, w, h, player_array, jump_h=18):
+    def __init__(self, x, y, w, h, jump_h=18):
         self.init_x = x
         self.init_y = y
         self.x = x
         self.y = y
+        self.prev_y = y
         self.w = w
         self.h = h
-        self.player_array = player_array
         self.is_jumping = False
         self.is_ascending = False
         self.jump_h = jump_h
-        assert self.player_array.shape == (self.h, self.w)
         self.is_landed_on_block = False
         self.block_y = None
 
@@ -32,6 +33,7 @@ class Player:
         return (self.x, self.y, self.w, self.h)
 
     def update(self):
+        self.prev_y = self.y
         if self.is_jumping:
             self.y -= 1
             # if reach max height -> descend
@@ -49,12 +51,12 @@ class Player:
             self.y += 1
             return
 
-    def draw_on(self, image: np.ndarray) -> np.ndarray:
-        """Draw player on top of an image."""
-        new_image = np.copy(image)
-        x, y, w, h = self.get_pos()
-        new_image[y : y + h, x : x + w] += self.player_array
-        return new_image
+    def reset(self):
+        self.x, self.y, self.prev_y = self.init_x, self.init_y, self.init_y
+        self.is_jumping = False
+        self.is_ascending = False
+        self.is_landed_on_block = False
+        self.block_y = None
 
     def jump(self):
         if self.is_jumping:
@@ -64,101 +66,13 @@ class Player:
         self.is_ascending = True
         self.block_y = None
 
-    def land_on_block(self, block):
+    def land_on_block(self, block_y):
         self.is_jumping = False
         self.is_landed_on_block = True
-        self.block_y = block.y
-
-
-class ObjectCollection(ABC):
-    def __init__(self):
-        self.objects = set()
-
-    @abstractmethod
-    def update(self):
-        pass
-
-    @abstractmethod
-    def draw(self):
-        pass
+        self.block_y = block_y
 
-    def update_pos(self, speed):
-        for object in self.objects:
-            object.x -= speed
-
-    def generate_object(self, obj_type):
-        self.objects.add(obj_type.generate())
-
-    def draw(self, pixel_array):
-        object_to_remove = set()
-        for obj in self.objects:
-            x, y, w, h = obj.get_pos()
-            if x + w < 0:
-                object_to_remove.add(obj)
-                continue
-            if 0 <= x <= screen_width:
-                obj.draw_on(pixel_array)
-        self.objects.difference_update(object_to_remove)
-
-    @abstractmethod
-    def reset(self):
-        """Reset collection states"""
-
-
-class CoinCollection(ObjectCollection):
-    def __init__(self):
-        super().__init__()
-        self._collision_count = 0
-
-    def update(self, player, speed):
-        if random.random() > 0.98:
-            self.generate_object(Coin)
-        self.update_pos(speed)
-        self.collision_detection(player)
 
-    def collision_detection(self, player):
-        coins_to_remove = set()
-        for coin in self.objects:
-            if coin.collision(player) != Collision.NONE:
-                self._collision_count += 1
-                coins_to_remove.add(coin)
-        self.objects.difference_update(coins_to_remove)
-
-    def get_collision_count(self):
-        return self._collision_count
-
-    def reset(self):
-        self.objects.clear()
-        self._collision_count = 0
-
-
-class BlockCollection(ObjectCollection):
-    def __init__(self):
-        super().__init__()
-
-    def update(self, speed):
-        if random.random() > 0.99:
-            self.generate_object(Block)
-        self.update_pos(speed)
-
-    def collision_detection(self, player) -> bool:
-        for obj in self.objects:
-            collision_type = obj.collision(player)
-            # print(obj.get_pos(), collision_type, player.get_pos())
-            if collision_type not in [Collision.NONE, Collision.BOTTOM]:
-                return True
-            if collision_type == Collision.BOTTOM:
-                player.land_on_block(obj)
-                return
-        # No any type of collision, go back to ground
-        player.is_landed_on_block = False
-        return False
-
-    def reset(self):
-        self.objects.clear()
-
-
-class Collision(Enum):
+class Collision(IntEnum):
     """The side of the player that is collided with an object"""
 
     TOP = auto()
@@ -168,153 +82,284 @@ class Collision(Enum):
     NONE = auto()
 
 
-class GameObject(ABC):
-    def __init__(self, y, w, h, image_array, x=screen_width):
-        self.x = x
-        self.y = y
-        self.w = w
-        self.h = h
-        self.image_array = image_array
-        assert self.image_array.shape == (self.h, self.w)
-
-    def get_pos(self):
-        return self.x, self.y, self.w, self.h
+class ObjectType(IntEnum):
+    COIN = 0
+    BLOCK = 1
+
+
+class GameObjects:
+    """Every coin and block in the game, stored as parallel NumPy arrays.
+
+    Live objects are kept compacted in `[0, count)`, so movement, collision
+    classification and culling are each one vectorized operation over that prefix
+    rather than a Python loop over object instances.
+    """
+
+    columns = ("x", "y", "w", "h", "type", "alive")
+
+    def __init__(self, capacity=64):
+        self.capacity = capacity
+        self.x = np.zeros(capacity, dtype=np.int32)
+        self.y = np.zeros(capacity, dtype=np.int32)
+        self.w = np.zeros(capacity, dtype=np.int32)
+        self.h = np.zeros(capacity, dtype=np.int32)
+        self.type = np.zeros(capacity, dtype=np.int8)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def grow(self):
+        self.capacity *= 2
+        for name in self.columns:
+            column = getattr(self, name)
+            grown = np.zeros(self.capacity, dtype=column.dtype)
+            grown[: self.count] = column[: self.count]
+            setattr(self, name, grown)
+
+    def spawn(self, obj_type: ObjectType, y, w, h, x=screen_width):
+        if self.count == self.capacity:
+            self.grow()
+        i = self.count
+        self.x[i], self.y[i], self.w[i], self.h[i] = x, y, w, h
+        self.type[i] = obj_type
+        self.alive[i] = True
+        self.count += 1
+
+    def generate(self, obj_type: ObjectType, rng: random.Random):
+        """Spawn an object at a random height on the right edge of the screen."""
+        y = rng.randint(16, screen_height - game_coin_min_h - 1)
+        w = rng.randint(game_coin_min_w, game_coin_max_w)
+        h = rng.randint(game_coin_min_h, min(screen_height - y, game_coin_max_h))
+        self.spawn(obj_type, y, w, h)
+
+    def of_type(self, obj_type: ObjectType) -> np.ndarray:
+        return (self.type[: self.count] == obj_type) & self.alive[: self.count]
 
-    def collision(self, player) -> Collision:
+    def update_pos(self, speed):
+        self.x[: self.count] -= speed
+
+    def collisions(self, player: Player) -> np.ndarray:
+        """Classify every live object's collision with `player` as `Collision` values."""
+        n = self.count
+        x, y = self.x[:n], self.y[:n]
+        object_right = x + self.w[:n]
+        object_bottom = y + self.h[:n]
         player_right = player.x + player.w
         player_bottom = player.y + player.h
-        object_right = self.x + self.w
-        object_bottom = self.y + self.h
 
-        self.is_collided = True
-        #! Super spaghetti code here but it does the job for now
-        if (
-            0 <= player_bottom - self.y <= 2
-            and player.y <= self.y
-            and player_right >= self.x
-            and player.x <= object_right
-        ):
-            return Collision.BOTTOM
-
-        if (
-            0 <= object_bottom - player.y <= 2
-            and player_bottom >= self.y
-            and player_right >= self.x
-            and player.x <= object_right
-        ):
-            return Collision.TOP
+        overlap_x = (player_right >= x) & (player.x <= object_right)
+        overlap_y = (player.y <= object_bottom) & (player_bottom >= y)
+        bottom_gap = player_bottom - y
+        top_gap = object_bottom - player.y
+        # First matching side wins, in the same order as the per-object checks were
+        return np.select(
+            [
+                (0 <= bottom_gap) & (bottom_gap <= 2) & (player.y <= y) & overlap_x,
+                (0 <= top_gap) & (top_gap <= 2) & (player_bottom >= y) & overlap_x,
+                overlap_x & overlap_y,
+                (player_right >= x) & (player.x <= x) & overlap_y,
+            ],
+            [Collision.BOTTOM, Collision.TOP, Collision.RIGHT, Collision.LEFT],
+            Collision.NONE,
+        )
 
-        if (
-            player.x <= object_right
-            and player_right >= self.x
-            and player.y <= object_bottom
-            and player_bottom >= self.y
-        ):
-            return Collision.RIGHT
+    def kill(self, mask: np.ndarray):
+        self.alive[: self.count][mask] = False
 
-        if (
-            player_right >= self.x
-            and player.x <= self.x
-            and player.y <= object_bottom
-            and player_bottom >= self.y
-        ):
-            return Collision.LEFT
+    def cull(self):
+        """Drop dead objects and those scrolled off the left edge, keeping the rest compacted."""
+        n = self.count
+        keep = self.alive[:n] & (self.x[:n] + self.w[:n] >= 0)
+        kept = int(np.count_nonzero(keep))
+        if kept == n:
+            return
+        for name in self.columns:
+            column = getattr(self, name)
+            column[:kept] = column[:n][keep]
+        self.count = kept
+
+    def draw(
+        self, framebuffer: FrameBuffer, obj_type: ObjectType, sprite: Sprite, offset=0
+    ):
+        """Draw objects of `obj_type` as `sprite`, shifted right by `offset` pixels."""
+        x = self.x[: self.count]
+        on_screen = (x >= -offset) & (x < framebuffer.width - offset)
+        for i in np.flatnonzero(self.of_type(obj_type) & on_screen):
+            framebuffer.blit(sprite, int(self.x[i]) + offset, int(self.y[i]))
 
-        self.is_collided = False
-        return Collision.NONE
+    def reset(self):
+        self.count = 0
+
+
+class MarioGame:
+    """State and rules of one Mario game, without any display or controller.
+
+    All randomness comes from `rng`, so a game replays exactly from its seed, and
+    time only advances through `tick`. The spawn chances are per tick.
+    """
+
+    def __init__(
+        self,
+        rng: Optional[random.Random] = None,
+        speed_divisor_score=game_speed_divisor_score,
+        coin_chance=game_coin_spawn_chance,
+        block_chance=game_block_spawn_chance,
+    ):
+        self.rng = rng or random.Random()
+        self.speed_divisor_score = speed_divisor_score
+        self.coin_chance = coin_chance
+        self.block_chance = block_chance
+        self.player = Player(59, 48, 10, 16)  # x, y, w, h
+        self.objects = GameObjects()
+        self.reset()
 
-    def draw_on(self, image: np.ndarray):
-        display_w = min(screen_width - self.x, self.w)
-        image[self.y : self.y + self.h, self.x : self.x + display_w] = self.image_array[
-            :, 0:display_w
-        ]
+    def reset(self):
+        self.score = 0
+        self.speed = 1
+        self.ticks = 0
+        # Pixels scrolled since the start of the game
+        self.distance = 0
+        self.is_gameover = False
+        # "coin", "landing" and "crash" collisions so far
+        self.collisions = Counter()
+        self.objects.reset()
+        self.player.reset()
 
-    @classmethod
-    def generate(cls):
-        """Method to generate an object."""
-        y = random.randint(16, screen_height - game_coin_min_h - 1)
-        w = random.randint(game_coin_min_w, game_coin_max_w)
-        h = random.randint(game_coin_min_h, min(screen_height - y, game_coin_max_h))
-        return cls(y, w, h)
+    def jump(self):
+        self.player.jump()
 
+    def tick(self):
+        """Advance the game by one simulation step"""
+        if self.is_gameover:
+            return
+        self.ticks += 1
+        if self.rng.random() < self.block_chance:
+            self.objects.generate(ObjectType.BLOCK, self.rng)
+        if self.rng.random() < self.coin_chance:
+            self.objects.generate(ObjectType.COIN, self.rng)
+        self.objects.update_pos(self.speed)
+        self.distance += self.speed
+        self.player.update()
 
-class Coin(GameObject):
-    def __init__(self, y, w, h, image_array=coin):
-        super().__init__(y, w, h, image_array)
-        self.is_collided = False
+        collisions = self.objects.collisions(self.player)
+        if self.block_collision(collisions):
+            self.collisions["crash"] += 1
+            self.is_gameover = True
+        coin_hits = self.objects.of_type(ObjectType.COIN) & (
+            collisions != Collision.NONE
+        )
+        hits = int(np.count_nonzero(coin_hits))
+        self.collisions["coin"] += hits
+        self.score += hits
+        self.objects.kill(coin_hits)
+        self.objects.cull()
+        self.update_game_speed()
 
+    def block_collision(self, collisions: np.ndarray) -> bool:
+        """Land the player on a block it stands on. Returns True if it ran into one."""
+        is_block = self.objects.of_type(ObjectType.BLOCK)
+        hit = is_block & (collisions != Collision.NONE)
+        if (hit & (collisions != Collision.BOTTOM)).any():
+            return True
+        landed = np.flatnonzero(hit)
+        if len(landed):
+            if not self.player.is_landed_on_block:
+                self.collisions["landing"] += 1
+            self.player.land_on_block(int(self.objects.y[landed[0]]))
+            return False
+        # No any type of collision, go back to ground
+        self.player.is_landed_on_block = False
+        return False
 
-class Block(GameObject):
-    def __init__(self, y, w, h, image_array=block):
-        super().__init__(y, w, h, image_array)
-        self.is_collided = False
+    def update_game_speed(self):
+        self.speed = self.score // self.speed_divisor_score + 1
 
 
 class Mario(Component):
-    def __init__(self, document):
+    def __init__(
+        self,
+        document,
+        interpolate=True,
+        game: Optional[MarioGame] = None,
+        background: Optional[Parallax] = None,
+    ):
+        from pigui.asset import player, coin, block
+
         super().__init__(document)
-        self.score = 0
-        self.speed = 1
-        self.pixel_array = np.full(
-            (screen_height, screen_width), game_bg_color, dtype=bool
-        )
-        self.player = Player(59, 48, 10, 16, player)  # x, y, w, h
+        self.game = game or MarioGame()
+        # Every frame is drawn into this one buffer and handed to the display as is
+        self.framebuffer = FrameBuffer(background=bool(game_bg_color))
+        self.score_atlas = get_atlas(font.resize(10))
+        self.score_text = "Score: 0"
+        self.score_text_value = 0
+        assert player.shape == (self.game.player.h, self.game.player.w)
+        self.player_sprite = Sprite(player)
+        self.sprites = {
+            ObjectType.COIN: Sprite.opaque(coin),
+            ObjectType.BLOCK: Sprite.opaque(block),
+        }
         self.register_event_listener(
-            EventListener(
+            InputListener(
                 [
-                    (self.document.controller.joystick.on_up, self.player.jump),
-                    (
-                        self.document.controller.joystick.on_press,
-                        self.on_press,
-                    ),
+                    ("joystick", "on_up", self.game.jump),
+                    ("joystick", "on_press", self.on_press),
                 ],
-                sleep=0.1,
                 debounce=0.3,
             )
         )
-        self.coins = CoinCollection()
-        self.blocks = BlockCollection()
         self.is_paused = False
-        self.is_gameover = False
+        # Physics runs at a fixed tick rate, decoupled from the display frame rate
+        self.timestep = FixedTimestep(game_tick_rate, game_max_ticks_per_frame)
+        self.interpolate = interpolate
+        # Scrolled along with the game, drawn behind everything else
+        self.background = background
 
     def render(self):
         """Render current frame of the game"""
-        self.reset_pixel_array()
-
-        if self.is_paused or self.is_gameover:
+        game = self.game
+        if self.is_paused or game.is_gameover:
+            # Don't catch up on the time spent stopped
+            self.timestep.reset()
             return
-        self.blocks.update(self.speed)
-        self.blocks.draw(self.pixel_array)
-        self.player.update()
-        if self.blocks.collision_detection(self.player):
-            print("boom")
-            self.is_gameover = True
-        self.coins.update(self.player, self.speed)
-        self.coins.draw(self.pixel_array)
-        self.score = self.coins.get_collision_count()
+        alpha = self.timestep.advance(self.tick)
+        # Draw between the last two ticks, `lag` ticks behind the newest state
+        lag = 1 - alpha if self.interpolate else 0
+
+        self.framebuffer.clear()
+        offset = round(game.speed * lag)
+        if self.background:
+            self.background.render(self.framebuffer, game.distance - offset)
+        for obj_type in (ObjectType.BLOCK, ObjectType.COIN):
+            game.objects.draw(
+                self.framebuffer, obj_type, self.sprites[obj_type], offset
+            )
         # Draw player
-        game = self.player.draw_on(self.pixel_array)
-        game_img = Image.fromarray(game)
+        player = game.player
+        player_y = round(player.y + (player.prev_y - player.y) * lag)
+        self.framebuffer.blit(self.player_sprite, player.x, player_y)
 
-        self.draw_score(game_img)
-        self.update_game_speed()
-        return game_img
+        self.draw_score()
+        return self.framebuffer.pixels
 
-    def draw_score(self, image: Image):
-        draw = ImageDraw.Draw(image)
-        draw.text((70, 2), f"Score: {self.score}", font=font.resize(10), fill=255)
+    def tick(self):
+        if self.is_paused or self.game.is_gameover:
+            return
+        self.game.tick()
+        if self.game.is_gameover:
+            print("boom")
 
-    def reset_pixel_array(self):
-        self.pixel_array = np.full(
-            (screen_height, screen_width), game_bg_color, dtype=bool
-        )
+    def draw_score(self):
+        # Only format the string when the score changes
+        score = self.game.score
+        if score != self.score_text_value:
+            self.score_text = f"Score: {score}"
+            self.score_text_value = score
+        self.score_atlas.blit(self.framebuffer, (70, 2), self.score_text)
 
     def reset_game(self):
-        self.is_gameover = False
-        self.score = 0
-        self.speed = 1
-        self.coins.reset()
-        self.blocks.reset()
+        self.game.reset()
 
     def pause_game(self):
         self.is_paused = not self.is_paused
@@ -324,10 +369,7 @@ class Mario(Component):
             print("Game resumed.")
 
     def on_press(self):
-        if self.is_gameover:
+        if self.game.is_gameover:
             self.reset_game()
             return
         self.pause_game()
-
-    def update_game_speed(self):
-        self.speed = self.score // game_speed_divisor_score + 1
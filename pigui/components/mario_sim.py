@@ -0,0 +1,150 @@
+"""Headless Mario simulation, for benchmarking the engine and tuning its constants.
+
+python -m pigui.components.mario_sim --games 1000 --speed-divisor 8
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Iterable, List, Optional, Tuple
+from pigui.components.mario import MarioGame
+from pigui.utils.profiler import percentile
+
+# (tick, action) pairs, the action being applied before that tick runs
+Script = Iterable[Tuple[int, str]]
+ACTIONS = {"jump": MarioGame.jump}
+
+
+def random_jumps(rng: random.Random, max_ticks: int, rate: float) -> Script:
+    """Script pressing jump on each tick with probability `rate`."""
+    return [(tick, "jump") for tick in range(max_ticks) if rng.random() < rate]
+
+
+def simulate(
+    seed: int,
+    script: Optional[Script] = None,
+    max_ticks=10000,
+    jump_rate=0.05,
+    **game_options,
+) -> dict:
+    """Play one game until game over or `max_ticks`.
+
+    The game is seeded from `seed`. Without a `script`, jumps are drawn at
+    `jump_rate` from a second RNG seeded from `seed`, so the result is reproducible
+    either way. `game_options` are passed to `MarioGame`.
+    """
+    game = MarioGame(random.Random(seed), **game_options)
+    if script is None:
+        script = random_jumps(random.Random(f"input-{seed}"), max_ticks, jump_rate)
+    actions = iter(sorted(script))
+    action = next(actions, None)
+
+    start = time.perf_counter()
+    while not game.is_gameover and game.ticks < max_ticks:
+        while action and action[0] <= game.ticks:
+            ACTIONS[action[1]](game)
+            action = next(actions, None)
+        game.tick()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "seed": seed,
+        "ticks": game.ticks,
+        "score": game.score,
+        "gameover": game.is_gameover,
+        "collisions": dict(game.collisions),
+        "elapsed": elapsed,
+    }
+
+
+def distribution(values: List[float]) -> dict:
+    values = sorted(values)
+    return {
+        "mean": statistics.fmean(values) if values else 0.0,
+        "stdev": statistics.pstdev(values) if values else 0.0,
+        "min": values[0] if values else 0,
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "p99": percentile(values, 99),
+        "max": values[-1] if values else 0,
+    }
+
+
+def summarize(results: List[dict], wall_time: float) -> dict:
+    ticks = sum(result["ticks"] for result in results)
+    scores = [result["score"] for result in results]
+    collisions = Counter()
+    for result in results:
+        collisions.update(result["collisions"])
+    return {
+        "games": len(results),
+        "ticks": ticks,
+        "wall_time": wall_time,
+        "ticks_per_second": ticks / wall_time if wall_time else 0.0,
+        # Engine throughput of a single process, excluding pool overhead
+        "ticks_per_second_per_process": ticks
+        / max(sum(result["elapsed"] for result in results), 1e-9),
+        "gameovers": sum(result["gameover"] for result in results),
+        "score": {
+            **distribution(scores),
+            "histogram": dict(sorted(Counter(scores).items())),
+        },
+        "game_ticks": distribution([result["ticks"] for result in results]),
+        "collisions": dict(collisions),
+    }
+
+
+def run_batch(games: int, seed=0, processes: Optional[int] = None, **options) -> dict:
+    """Simulate `games` games with consecutive seeds from `seed` across a process pool.
+    `options` are passed to `simulate`.
+    """
+    seeds = range(seed, seed + games)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(processes) as pool:
+        chunksize = max(1, games // (8 * (processes or os.cpu_count() or 1)))
+        results = list(
+            pool.map(partial(simulate, **options), seeds, chunksize=chunksize)
+        )
+    return summarize(results, time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--max-ticks", type=int, default=10000)
+    parser.add_argument("--jump-rate", type=float, default=0.05)
+    parser.add_argument("--speed-divisor", type=int, default=None)
+    parser.add_argument("--coin-chance", type=float, default=None)
+    parser.add_argument("--block-chance", type=float, default=None)
+    args = parser.parse_args()
+
+    game_options = {
+        name: value
+        for name, value in [
+            ("speed_divisor_score", args.speed_divisor),
+            ("coin_chance", args.coin_chance),
+            ("block_chance", args.block_chance),
+        ]
+        if value is not None
+    }
+    summary = run_batch(
+        args.games,
+        args.seed,
+        args.processes,
+        max_ticks=args.max_ticks,
+        jump_rate=args.jump_rate,
+        **game_options,
+    )
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,48 @@
 from PIL import Image, ImageDraw
-from pigui.ui import Component, Document, EventListener
+from pigui.ui import Component, Document, InputListener
 from pigui.utils.constants import *
+from pigui.utils.text import draw_text
 
 
 class Menu(Component):
+    retained = True
+
     def __init__(self, document: Document):
         super().__init__(document)
         self.document = document
         self.prev_cur_position = None
-        self.menu_items = ["Camera", "Statistic", "Clock", "Draw"]
-        self.cur_position = 1
+        self.menu_items = ["Camera", "Gallery", "Statistic", "Clock", "Draw"]
+        self.cur_position = self.menu_items.index("Statistic")
+        # Index of the top row shown, scrolled to keep the selection in view
+        self.first_visible = 0
 
         evt_cb_tup = [
-            (self.document.controller.joystick.on_press, self.on_click),
-            (self.document.controller.joystick.on_up, self.prev_item),
-            (self.document.controller.joystick.on_right, self.next_item),
+            ("joystick", "on_press", self.on_click),
+            ("joystick", "on_up", self.prev_item),
+            ("joystick", "on_right", self.next_item),
         ]
 
-        self.event_listeners.append(EventListener(evt_cb_tup, sleep=0.1, debounce=0.5))
+        self.register_event_listener(InputListener(evt_cb_tup, debounce=0.5))
 
     def render(self):
         image = Image.new("1", (128, 64))
         draw = ImageDraw.Draw(image)
-        for i, item in enumerate(self.menu_items):
-            x, y = 0, i * text_line_height_px
+        if self.cur_position < self.first_visible:
+            self.first_visible = self.cur_position
+        elif self.cur_position >= self.first_visible + text_lines:
+            self.first_visible = self.cur_position - text_lines + 1
+        visible_items = self.menu_items[
+            self.first_visible : self.first_visible + text_lines
+        ]
+        for row, item in enumerate(visible_items):
+            i = self.first_visible + row
+            x, y = 0, row * text_line_height_px
             if i == self.cur_position:
                 draw.rectangle(((x, y), (128, y + 16)), outline=0, fill=255)
-                draw.text((0 + text_left_padding, y), item, font=font, fill=0)
+                draw_text(image, (0 + text_left_padding, y), item, font=font, fill=0)
             else:
                 draw.rectangle(((x, y), (128, y + 16)), outline=0, fill=0)
-                draw.text((0 + text_left_padding, y), item, font=font, fill=255)
+                draw_text(image, (0 + text_left_padding, y), item, font=font, fill=255)
 
         return image
 
@@ -38,6 +51,8 @@ class Menu(Component):
         print(f"Selected {cur_item}")
         if cur_item == "Camera":
             self.document.goto_frame("camera")
+        elif cur_item == "Gallery":
+            self.document.goto_frame("gallery")
         elif cur_item == "Statistic":
             self.document.goto_frame("stat")
         elif cur_item == "Draw":
@@ -50,6 +65,7 @@ class Menu(Component):
             if self.cur_position == 0
             else self.cur_position - 1
         )
+        self.invalidate()
 
     def next_item(self):
         print("pressed Right")
@@ -58,3 +74,4 @@ class Menu(Component):
             if self.cur_position == len(self.menu_items) - 1
             else self.cur_position + 1
         )
+        self.invalidate()
@@ -0,0 +1,47 @@
+from typing import Optional
+import numpy as np
+from PIL import Image, ImageDraw
+from pigui.ui import Component
+from pigui.utils.constants import screen_frame_rate
+from pigui.utils.profiler import Profiler, profiler as default_profiler
+from pigui.utils.text import draw_text
+
+
+class PerfOverlay(Component):
+    """Live FPS and frame time bars, drawn as a strip over the bottom of a frame.
+
+    Each bar is one recent `Document.render`, full height being the scheduler's
+    frame budget; frames over budget are drawn as full height dotted bars. Pack it last
+    so it's layered on top: `frame.pack_component(PerfOverlay(document))`.
+    """
+
+    def __init__(self, document, height=12, profiler: Optional[Profiler] = None):
+        super().__init__(document)
+        self.height = height
+        self.profiler = profiler or default_profiler
+        self.text_width = 48
+
+    def get_bounding_region(self):
+        return (0, 64 - self.height, 128, 64)
+
+    def render(self):
+        image = Image.new("1", (128, self.height))
+        draw = ImageDraw.Draw(image)
+        draw.rectangle((0, 0, 127, self.height - 1), outline=255)
+        draw_text(image, (2, 1), f"{self.profiler.fps():4.1f}fps")
+
+        bar_count = 128 - self.text_width - 1
+        frame_ms = self.profiler.samples("document.render")[-bar_count:] / 1e6
+        budget_ms = (
+            self.document.scheduler.frame_budget * 1000 or 1000 / screen_frame_rate
+        )
+        heights = np.minimum(frame_ms / budget_ms, 1) * (self.height - 2)
+        for x, (ms, bar) in enumerate(zip(frame_ms, heights)):
+            x += self.text_width
+            bottom = self.height - 2
+            if ms > budget_ms:
+                # Over budget
+                draw.line((x, 1, x, bottom), fill=255 if x % 2 else 0)
+            elif bar >= 1:
+                draw.line((x, bottom - round(bar) + 1, x, bottom), fill=255)
+        return image
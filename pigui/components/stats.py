@@ -1,11 +1,14 @@
 import subprocess
 import psutil
-from PIL import Image, ImageDraw
-from pigui.ui import Component, Document, EventListener, State
+from PIL import Image
+from pigui.ui import Component, Document, EventListener, InputListener, State
 from pigui.utils.constants import *
+from pigui.utils.text import draw_text
 
 
 class StatApp(Component):
+    retained = True
+
     def __init__(self, document):
         super().__init__(document)
         self.document = document
@@ -15,27 +18,28 @@ class StatApp(Component):
         self.disk = State("")
         self.font = font
 
-        # Separate listeners one for updating screen @2s, one for listening to input @0.1s
-        update_listener = EventListener([(True, self.update_sys_info)], sleep=2)
-        input_listener = EventListener(
-            [(self.document.controller.joystick.on_press, self.goto_frame_fn("menu"))],
-            sleep=0.1,
+        # Separate listeners one for updating screen @2s, one for input presses
+        # Shells out and reads psutil, so it runs off the shared scheduler thread
+        update_listener = EventListener(
+            [(True, self.update_sys_info)], sleep=2, blocking=True
+        )
+        input_listener = InputListener(
+            [("joystick", "on_press", self.goto_frame_fn("menu"))],
             debounce=0.5,
         )
         self.register_event_listener([update_listener, input_listener])
 
     def render(self) -> Image:
         image = Image.new("1", (128, 64))
-        draw = ImageDraw.Draw(image)
 
         padding = 0
         top = padding
         x = 0
         # Write four lines of text.
-        draw.text((x, top + 0), f"IP: {self.ip.state}", font=self.font, fill=255)
-        draw.text((x, top + 16), f"CPU: {self.cpu.state}", font=self.font, fill=255)
-        draw.text((x, top + 32), f"RAM: {self.mem.state}", font=self.font, fill=255)
-        draw.text((x, top + 48), f"DISK: {self.disk.state}", font=self.font, fill=255)
+        draw_text(image, (x, top + 0), f"IP: {self.ip.state}", font=self.font)
+        draw_text(image, (x, top + 16), f"CPU: {self.cpu.state}", font=self.font)
+        draw_text(image, (x, top + 32), f"RAM: {self.mem.state}", font=self.font)
+        draw_text(image, (x, top + 48), f"DISK: {self.disk.state}", font=self.font)
         return image
 
     def update_sys_info(self):
@@ -44,6 +48,7 @@ class StatApp(Component):
         self.cpu.update(CPU)
         self.mem.update(RAM)
         self.disk.update(DISK)
+        self.invalidate()
 
     def get_sys_info(self):
         IP = subprocess.check_output("hostname -I | cut -d' ' -f1", shell=True).decode(
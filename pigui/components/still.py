@@ -1,10 +1,10 @@
-from PIL import Image, ImageDraw
+from PIL import Image
 from abc import ABC, abstractmethod
+from pigui.utils.text import draw_text
 
 
 class Still(ABC):
     def text(text: str):
         image = Image.new("1", (128, 64))
-        draw = ImageDraw.Draw(image)
-        draw.text((0, 27), text, fill=255)
+        draw_text(image, (0, 27), text)
         return image
@@ -1,18 +1,130 @@
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
 from io import BytesIO
-from typing import Generator, Union
-import picamera
+from queue import Full, Queue
+from threading import Condition, Event, Lock, Thread
+from typing import Callable, Generator, List, NamedTuple, Optional, Tuple, Union
+import numpy as np
 from numpy import ndarray
-from picamera.array import PiRGBArray
 from PIL import Image
 from pigui.utils.constants import *
 
 
+class FrameRing:
+    """Small ring of preallocated frame arrays, filled by one capture thread.
+
+    `writer` yields the slots to capture into in turn, and a slot is published as
+    the latest frame once the next one is requested. Readers get the newest slot
+    without copying; it stays untouched for the next `size - 1` captures.
+    """
+
+    def __init__(self, shape: Tuple[int, ...], size=3, dtype=np.uint8):
+        self.slots = [np.empty(shape, dtype=dtype) for _ in range(size)]
+        self.latest_index: Optional[int] = None
+        self.frame_count = 0
+        self.lock = Lock()
+
+    def writer(self, stop: Event) -> Generator[ndarray, None, None]:
+        index = 0
+        while not stop.is_set():
+            yield self.slots[index]
+            with self.lock:
+                self.latest_index = index
+                self.frame_count += 1
+            index = (index + 1) % len(self.slots)
+
+    def latest(self) -> Optional[ndarray]:
+        with self.lock:
+            if self.latest_index is None:
+                return None
+            return self.slots[self.latest_index]
+
+    def reset(self):
+        with self.lock:
+            self.latest_index = None
+
+
+class FrameHistory:
+    """Rolling buffer of the most recent full resolution MJPEG frames.
+
+    Used as a picamera recording output: `write` receives the encoder's chunks and
+    every completed frame is kept with the `time.monotonic()` it arrived at.
+    """
+
+    def __init__(self, camera, size=8):
+        self.camera = camera
+        self.frames = deque(maxlen=size)  # (timestamp, jpeg bytes)
+        self.current = BytesIO()
+        self.condition = Condition()
+
+    def write(self, data) -> int:
+        self.current.write(data)
+        if self.camera.frame.complete:
+            with self.condition:
+                self.frames.append((time.monotonic(), self.current.getvalue()))
+                self.condition.notify_all()
+            self.current.seek(0)
+            self.current.truncate()
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self, timestamp: float, n=1, timeout=1.0) -> List[bytes]:
+        """Return the frame nearest `timestamp` and the `n - 1` frames after it,
+        waiting up to `timeout` for frames that haven't arrived yet.
+        """
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while True:
+                frames = list(self.frames)
+                if frames:
+                    nearest = min(
+                        range(len(frames)), key=lambda i: abs(frames[i][0] - timestamp)
+                    )
+                    # The nearest frame may still be ahead of us
+                    if nearest < len(frames) - 1 or frames[nearest][0] >= timestamp:
+                        if len(frames) - nearest >= n:
+                            return [data for _, data in frames[nearest : nearest + n]]
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return [data for _, data in frames[-n:]]
+                self.condition.wait(remaining)
+
+
 class Camera:
-    def __init__(self, image_resolution=(1920, 1080)):
-        self.camera = picamera.PiCamera()
-        self.camera.resolution = (screen_width, screen_height)
+    def __init__(self, image_resolution=(1920, 1080), camera=None, zsl=False):
+        """`camera` defaults to a `picamera.PiCamera`; any object with the same
+        `capture`/`capture_sequence` API, such as a fake frame source, can stand in.
+
+        With `zsl` (zero shutter lag) the sensor stays at `image_resolution`: the
+        preview is resized on the GPU from splitter port 0 while port 1 records MJPEG
+        into a `FrameHistory`, and stills are taken from it without a mode switch.
+        """
+        if camera is None:
+            import picamera
+
+            camera = picamera.PiCamera()
+        self.camera = camera
         self.image_resolution = image_resolution
+        self.zsl = zsl
+        self.camera.resolution = (
+            image_resolution if zsl else (screen_width, screen_height)
+        )
         self.camera.framerate = screen_frame_rate
+        self.history = FrameHistory(self.camera) if zsl else None
+        self.is_recording_history = False
+
+        # Persistent preview capture into a ring of preallocated YUV420 frames; the
+        # GPU scales to screen size and only the Y (luminance) plane is used
+        self.preview_ring = FrameRing((screen_height * screen_width * 3 // 2,))
+        self.stream_stop = Event()
+        self.stream_thread: Optional[Thread] = None
+        # Set while stills are taken, keeps `latest_frame` from restarting the stream
+        self.stream_paused = False
+        self.stream_lock = Lock()
 
     def capture_img_stream(self, format="jpeg") -> BytesIO:
         img_stream = BytesIO()
@@ -20,13 +132,47 @@ class Camera:
         return img_stream
 
     def capture_image(self, path="PI_IMG.jpeg", format="jpeg"):
-        # Update camera resolution when taking photo
-        self.camera.resolution = self.image_resolution
-        self.camera.capture(path, format=format)
-        # Revert camera resolution optimized for video/preview mode when done
-        self.camera.resolution = (screen_width, screen_height)
+        with self.paused_stream():
+            # Update camera resolution when taking photo
+            self.camera.resolution = self.image_resolution
+            self.camera.capture(path, format=format)
+            # Revert camera resolution optimized for video/preview mode when done
+            self.camera.resolution = (screen_width, screen_height)
+
+    def capture_burst(self, n: int, format="jpeg") -> List[BytesIO]:
+        """Capture `n` full resolution stills in quick succession, encoded in memory,
+        with a single resolution switch for the whole burst.
+        """
+        streams = [BytesIO() for _ in range(n)]
+        with self.paused_stream():
+            self.camera.resolution = self.image_resolution
+            self.camera.capture_sequence(streams, format=format, burst=n > 1)
+            self.camera.resolution = (screen_width, screen_height)
+        return streams
+
+    def capture_zsl(self, timestamp: float, n=1) -> List[BytesIO]:
+        """Stills from the rolling full resolution buffer, starting with the frame
+        nearest `timestamp` (a `time.monotonic()` value, e.g. `InputEvent.timestamp`).
+        """
+        if not self.zsl:
+            raise ValueError("Camera not in zero shutter lag mode.")
+        self.start_stream()
+        return [BytesIO(data) for data in self.history.take(timestamp, n)]
+
+    @contextmanager
+    def paused_stream(self):
+        """Stop the preview worker for the duration of a sensor reconfiguration."""
+        with self.stream_lock:
+            self.stream_paused = True
+        self.stop_stream()
+        try:
+            yield
+        finally:
+            self.stream_paused = False
 
     def video_stream(self, format="bgr") -> Generator:
+        from picamera.array import PiRGBArray
+
         vid_stream = PiRGBArray(self.camera)
         for frame in self.camera.capture_continuous(
             vid_stream, format=format, use_video_port=True
@@ -35,10 +181,180 @@ class Camera:
             # Clear buffer before next frame
             vid_stream.truncate(0)
 
+    def start_stream(self):
+        """Start the preview capture worker if it isn't running or paused."""
+        with self.stream_lock:
+            if self.stream_paused:
+                return
+            if self.stream_thread and self.stream_thread.is_alive():
+                return
+            if self.zsl and not self.is_recording_history:
+                self.camera.start_recording(
+                    self.history, format="mjpeg", splitter_port=1
+                )
+                self.is_recording_history = True
+            self.stream_stop.clear()
+            self.stream_thread = Thread(target=self.run_stream, daemon=True)
+            self.stream_thread.start()
+
+    def run_stream(self):
+        # In ZSL mode the sensor runs at full resolution, scale down on the GPU
+        kwargs = {"resize": (screen_width, screen_height)} if self.zsl else {}
+        self.camera.capture_sequence(
+            self.preview_ring.writer(self.stream_stop),
+            format="yuv",
+            use_video_port=True,
+            splitter_port=0,
+            **kwargs,
+        )
+
+    def stop_stream(self):
+        self.stream_stop.set()
+        if self.stream_thread:
+            self.stream_thread.join()
+            self.stream_thread = None
+        self.preview_ring.reset()
+
+    def latest_frame(self) -> Optional[ndarray]:
+        """Luminance plane of the newest preview frame as a (height, width) uint8 view,
+        or None until the first one arrives. Never blocks.
+        """
+        self.start_stream()
+        frame = self.preview_ring.latest()
+        if frame is None:
+            return None
+        return frame[: screen_height * screen_width].reshape(
+            screen_height, screen_width
+        )
+
     def close(self):
+        self.stop_stream()
+        if self.is_recording_history:
+            self.camera.stop_recording(splitter_port=1)
+            self.is_recording_history = False
         self.camera.close()
 
 
+class CaptureProgress(NamedTuple):
+    pending: int  # shots requested but not written yet
+    saved: int  # shots written since the queue started
+    last_path: Optional[str] = None
+    error: Optional[str] = None
+
+
+class CaptureQueue:
+    """Background still capture -> write pipeline.
+
+    `request` only enqueues a job (one path per shot) on a bounded queue. A capture
+    thread takes each job as one burst, encoded to JPEG in memory, and hands the
+    buffers to a writer thread so the next burst can start while files are written.
+    Every change is reported to `on_progress` as a `CaptureProgress`, and every
+    written file to `on_saved(path, stream)` from the writer thread.
+    """
+
+    def __init__(
+        self,
+        camera: Camera,
+        on_progress: Optional[Callable[[CaptureProgress], None]] = None,
+        max_jobs=4,
+        on_saved: Optional[Callable[[str, BytesIO], None]] = None,
+    ):
+        self.camera = camera
+        self.on_progress = on_progress
+        self.on_saved = on_saved
+        self.jobs: Queue = Queue(maxsize=max_jobs)
+        self.writes: Queue = Queue()
+        self.progress = CaptureProgress(0, 0)
+        self.lock = Lock()
+
+        self.capture_thread = Thread(target=self.run_capture, daemon=True)
+        self.write_thread = Thread(target=self.run_write, daemon=True)
+        self.capture_thread.start()
+        self.write_thread.start()
+
+    def request(self, paths: List[str], timestamp: Optional[float] = None) -> bool:
+        """Queue a capture of `len(paths)` shots. Returns False if the queue is full.
+        On a ZSL camera the shots start from the frame nearest `timestamp`.
+        """
+        try:
+            self.jobs.put_nowait((paths, timestamp))
+        except Full:
+            return False
+        self.report(pending=len(paths))
+        return True
+
+    def report(self, pending=0, saved=0, last_path=None, error=None):
+        # Delivered under the lock so reports from different threads arrive in order
+        with self.lock:
+            progress = self.progress
+            self.progress = CaptureProgress(
+                progress.pending + pending,
+                progress.saved + saved,
+                last_path or progress.last_path,
+                error,
+            )
+            if self.on_progress:
+                self.on_progress(self.progress)
+
+    def run_capture(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                self.writes.put(None)
+                return
+            paths, timestamp = job
+            try:
+                if self.camera.zsl:
+                    streams = self.camera.capture_zsl(
+                        timestamp or time.monotonic(), len(paths)
+                    )
+                else:
+                    streams = self.camera.capture_burst(len(paths))
+            except Exception as e:
+                self.report(pending=-len(paths), error=str(e))
+                continue
+            missing = len(paths) - len(streams)
+            if missing:
+                self.report(pending=-missing, error=f"{missing} frame(s) unavailable")
+            for path, stream in zip(paths, streams):
+                self.writes.put((path, stream))
+
+    def run_write(self):
+        while True:
+            item = self.writes.get()
+            if item is None:
+                return
+            path, stream = item
+            try:
+                with open(path, "wb") as f:
+                    f.write(stream.getbuffer())
+            except OSError as e:
+                self.report(pending=-1, error=str(e))
+                continue
+            if self.on_saved:
+                self.on_saved(path, stream)
+            self.report(pending=-1, saved=1, last_path=path)
+
+    def close(self):
+        """Finish the queued captures and stop both threads."""
+        self.jobs.put(None)
+        self.capture_thread.join()
+        self.write_thread.join()
+
+
+# 4x4 Bayer matrix scaled to 8-bit thresholds
+BAYER_4X4 = (
+    np.array([[0, 8, 2, 10], [12, 4, 14, 6], [3, 11, 1, 9], [15, 7, 13, 5]]) + 0.5
+) * 16
+
+DITHER_MODES = ["threshold", "bayer", "diffusion"]
+
+
+@lru_cache(maxsize=None)
+def bayer_thresholds(height: int, width: int) -> ndarray:
+    return np.tile(BAYER_4X4, (height // 4 + 1, width // 4 + 1))[:height, :width]
+
+
 class ImageProcessor:
     @staticmethod
     def load_img(img: Union[str, BytesIO, ndarray], resize=None) -> Image:
@@ -50,6 +366,33 @@ class ImageProcessor:
             return image.resize(resize, Image.ANTIALIAS).convert("1")
         return image
 
+    @staticmethod
+    def dither(luma: ndarray, mode="bayer", threshold=128) -> ndarray:
+        """Convert an 8-bit luminance array to a 1-bit bool array.
+
+        - `threshold`: plain cut-off at `threshold`.
+        - `bayer`: ordered dithering with a tiled 4x4 Bayer matrix.
+        - `diffusion`: error diffusion that pushes each pixel's error onto the next
+          row only (1/4, 1/2, 1/4), so every row is a single vectorized step.
+        """
+        if mode == "threshold":
+            return luma >= threshold
+        if mode == "bayer":
+            return luma >= bayer_thresholds(*luma.shape)
+        if mode == "diffusion":
+            height, width = luma.shape
+            pixels = np.empty((height, width), dtype=bool)
+            carry = np.zeros(width + 2, dtype=np.float32)
+            for y in range(height):
+                row = luma[y] + carry[1:-1]
+                pixels[y] = row >= threshold
+                error = row - pixels[y] * 255
+                carry[1:-1] = error * 0.5
+                carry[:-2] += error * 0.25
+                carry[2:] += error * 0.25
+            return pixels
+        raise ValueError(f"Invalid dither mode `{mode}`.")
+
     @staticmethod
     def convert_ppm(img: Union[str, BytesIO]):
         img = Image.open(img).resize((128, 64), Image.ANTIALIAS).convert("1")
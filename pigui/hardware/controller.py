@@ -1,16 +1,166 @@
 import time
-from abc import ABC, abstractmethod
-from threading import Thread
-from typing import Callable, List, Union
-import RPi.GPIO as GPIO
+from abc import ABC
+from collections import defaultdict
+from itertools import count
+from queue import Empty, Queue
+from threading import Lock, Thread
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+from pigui.hardware.gpio import LOW, GPIOBackend, RPiGPIO
+from pigui.utils.latency import latency_tracer
+
+# Edges closer than this to the last dispatched one on a pin are bounces, in seconds
+EDGE_DEBOUNCE = 0.02
+
+
+class InputEvent(NamedTuple):
+    """A press or release edge of one controller input."""
+
+    controller: str  # e.g. "joystick"
+    name: str  # event type, e.g. "on_press"
+    edge: str  # "press" or "release"
+    timestamp: float  # `time.monotonic()` of the edge
+    seq: int = 0  # order of the event among all dispatched ones
+
+    @property
+    def type(self) -> str:
+        return f"{self.controller}.{self.name}"
+
+
+class InputDispatcher:
+    """Central input thread.
+
+    GPIO edge callbacks only enqueue `(pin, level, timestamp)`; the dispatcher thread
+    turns them into `InputEvent`s and calls the subscribers, so slow callbacks never
+    hold up edge detection.
+
+    Debouncing is done here from edge timestamps: the first edge that changes a
+    pin's level is dispatched right away and edges within `debounce` seconds of it
+    are ignored. Once a pin has been quiet for `debounce` its level is read back, so
+    a change hidden among the bounces, e.g. a quick release, is still dispatched.
+    """
+
+    def __init__(self, backend: GPIOBackend, debounce=EDGE_DEBOUNCE):
+        self.backend = backend
+        self.debounce = debounce
+        self.queue: Queue = Queue()
+        self.pins: Dict[int, Tuple["Controller", str]] = {}
+        self.levels: Dict[int, int] = {}
+        self.last_edge_times: Dict[int, float] = {}
+        # Pin -> when its bouncing is over and its level should be read back
+        self.settle_times: Dict[int, float] = {}
+        self.subscribers: Dict[tuple, List[Callable]] = defaultdict(list)
+        self.lock = Lock()
+        self.seq = count(1)
+
+        self.thread = Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def register_pin(self, pin: int, controller: "Controller", event: str):
+        self.pins[pin] = (controller, event)
+        self.levels[pin] = self.backend.input(pin)
+        self.backend.watch(pin, self.on_edge)
+
+    def on_edge(self, pin: int, level: int, timestamp: float):
+        self.queue.put((pin, level, timestamp))
+
+    def subscribe(
+        self,
+        controller: "Controller",
+        event: str,
+        edge: str,
+        callback: Callable[[InputEvent], None],
+    ) -> Callable:
+        """Call `callback(event)` on every `edge` of `controller`'s `event`.
+        Returns a function that removes the subscription.
+        """
+        if edge not in ["press", "release"]:
+            raise ValueError("Invalid edge.")
+        key = (controller, event, edge)
+        with self.lock:
+            self.subscribers[key].append(callback)
+
+        def unsubscribe():
+            with self.lock:
+                if callback in self.subscribers[key]:
+                    self.subscribers[key].remove(callback)
+
+        return unsubscribe
+
+    def run(self):
+        while True:
+            timeout = None
+            if self.settle_times:
+                timeout = max(0.0, min(self.settle_times.values()) - time.monotonic())
+            try:
+                pin, level, timestamp = self.queue.get(timeout=timeout)
+            except Empty:
+                self.settle()
+                continue
+
+            self.settle_times[pin] = timestamp + self.debounce
+            if timestamp - self.last_edge_times.get(pin, float("-inf")) < self.debounce:
+                continue
+            self.dispatch(pin, level, timestamp)
+
+    def settle(self):
+        """Resync the pins that stopped bouncing with their actual level."""
+        now = time.monotonic()
+        for pin, settle_time in list(self.settle_times.items()):
+            if settle_time > now:
+                continue
+            del self.settle_times[pin]
+            self.dispatch(pin, self.backend.input(pin), now)
+
+    def dispatch(self, pin: int, level: int, timestamp: float):
+        # Bounces can report the same level twice
+        if level == self.levels.get(pin):
+            return
+        self.levels[pin] = level
+        self.last_edge_times[pin] = timestamp
+
+        controller, event = self.pins[pin]
+        edge = "press" if level == LOW else "release"
+        input_event = InputEvent(
+            controller.name, event, edge, timestamp, next(self.seq)
+        )
+        with self.lock:
+            callbacks = list(self.subscribers[(controller, event, edge)])
+        if not callbacks:
+            return
+        trace = latency_tracer.begin(input_event)
+        for callback in callbacks:
+            callback(input_event)
+        latency_tracer.end(trace)
 
 
-# TODO - add debounce mechanism
 class Controller(ABC):
     """Individual controller such as button, joystick, etc."""
 
-    def __init__(self):
+    name = "controller"
+
+    def __init__(self, dispatcher: Optional[InputDispatcher] = None):
+        self.dispatcher = dispatcher or InputDispatcher(RPiGPIO())
+        self.backend = self.dispatcher.backend
         self.event_types = {}  # `event`: func() -> bool
+        self.event_pins = {}  # `event`: gpio pin
+
+    def register_pin(self, event: str, pin: int, pull_up=True):
+        self.backend.setup_input(pin, pull_up)
+        self.event_pins[event] = pin
+        self.dispatcher.register_pin(pin, self, event)
+
+    def is_pressed(self, event: str) -> bool:
+        return self.backend.input(self.event_pins[event]) == LOW
+
+    def subscribe(
+        self, type: str, callback: Callable[[InputEvent], None], edge="press"
+    ) -> Callable:
+        """Subscribe `callback(event)` to press/release edges of `type`.
+        Returns a function that removes the subscription.
+        """
+        if type not in self.event_pins:
+            raise ValueError("Invalid event type.")
+        return self.dispatcher.subscribe(self, type, edge, callback)
 
     def set_event_listener(
         self, type: str, callback: Callable, criteria: Union[str, Callable]
@@ -21,34 +171,31 @@ class Controller(ABC):
         if not callable(criteria) and criteria not in ["once", "infinite"]:
             raise ValueError("Invalid criteria.")
 
-        event_listen_fn = self.event_types[type]
-
-        def event_listener():
-            while True:
-                # Event not triggered -> continue listening
-                if not event_listen_fn():
-                    time.sleep(0.1)
-                    continue
-                # Event triggered
-                callback()
-                # TODO refactor this ugly monstrosity
-                if criteria == "once":
-                    break
-                if callable(criteria) and criteria():
-                    break
+        def on_event(event: InputEvent):
+            callback()
+            if criteria == "once" or (callable(criteria) and criteria()):
+                unsubscribe()
 
-        thread = Thread(target=event_listener)
-        thread.start()
+        unsubscribe = self.subscribe(type, on_event)
 
 
 class Joystick(Controller):
-    def __init__(self, gpio_x_pin, gpio_y_pin, gpio_z_pin):
-        GPIO.setmode(GPIO.BCM)
+    name = "joystick"
+
+    def __init__(
+        self,
+        gpio_x_pin,
+        gpio_y_pin,
+        gpio_z_pin,
+        dispatcher: Optional[InputDispatcher] = None,
+    ):
+        super().__init__(dispatcher)
         self.gpio_x_pin = gpio_x_pin
         self.gpio_y_pin = gpio_y_pin
         self.gpio_z_pin = gpio_z_pin
-        GPIO.setup([gpio_x_pin, gpio_y_pin], GPIO.IN, pull_up_down=GPIO.PUD_UP)
-        GPIO.setup(gpio_z_pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+        self.register_pin("on_right", gpio_x_pin)
+        self.register_pin("on_up", gpio_y_pin)
+        self.register_pin("on_press", gpio_z_pin)
 
         self.event_types = {
             "on_press": self.on_press,
@@ -57,42 +204,37 @@ class Joystick(Controller):
         }
 
     def on_press(self):
-        if GPIO.input(self.gpio_z_pin) == 0:
-            return True
-        return False
+        return self.is_pressed("on_press")
 
     def on_up(self):
-        if GPIO.input(self.gpio_y_pin) == 0:
-            return True
-        return False
+        return self.is_pressed("on_up")
 
     def on_right(self):
-        if GPIO.input(self.gpio_x_pin) == 0:
-            return True
-        return False
+        return self.is_pressed("on_right")
 
 
 class Button(Controller):
-    def __init__(self, gpio_pin: int):
+    name = "button"
+
+    def __init__(self, gpio_pin: int, dispatcher: Optional[InputDispatcher] = None):
+        super().__init__(dispatcher)
         self.gpio_pin = gpio_pin
-        GPIO.setmode(GPIO.BCM)
-        GPIO.setup(gpio_pin, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
+        self.register_pin("on_press", gpio_pin, pull_up=False)
 
         self.event_types = {"on_press": self.on_press}
 
     def on_press(self):
-        if GPIO.input(self.gpio_pin) == 0:
-            return True
-        return False
+        return self.is_pressed("on_press")
 
 
 # TODO this interface kind of weird
 class MasterController:
     """Interface for all controller/input devices."""
 
-    def __init__(self):
-        self.joystick = Joystick(27, 17, 22)
-        self.button = Button(4)
+    def __init__(self, backend: Optional[GPIOBackend] = None):
+        self.dispatcher = InputDispatcher(backend or RPiGPIO())
+        self.joystick = Joystick(27, 17, 22, self.dispatcher)
+        self.button = Button(4, self.dispatcher)
 
     def on_up(self):
         self.joystick.on_up()
@@ -1,20 +1,265 @@
-import board
-import busio
-import adafruit_ssd1306
+import numpy as np
+from threading import Condition, Thread
 from PIL import Image
+from typing import Callable, List, Optional, Tuple, Union
+from pigui.utils.profiler import profiler
+from pigui.utils.region import Region, union_regions
+
+# SSD1306 addressing commands
+SET_COL_ADDR = 0x21
+SET_PAGE_ADDR = 0x22
+
+# Opening an address window costs six single-byte command transactions, roughly
+# the bus time of this many data bytes
+WINDOW_OVERHEAD_BYTES = 12
+
+
+def changed_windows(
+    prev,
+    cur,
+    width=128,
+    pages=8,
+    overhead=WINDOW_OVERHEAD_BYTES,
+    region: Optional[Region] = None,
+) -> List[Tuple[int, int, int, int]]:
+    """Find the address windows covering every byte that differs between two page buffers.
+
+    Each window is `(page_start, page_end, col_start, col_end)`, inclusive. Adjacent
+    pages are merged into a single window when that is cheaper than opening a new one.
+    With `region`, only the pages/columns overlapping it are compared.
+    """
+    left, top, right, bottom = region or (0, 0, width, pages * 8)
+    page_offset = top // 8
+    prev = np.frombuffer(prev, dtype=np.uint8).reshape(pages, width)
+    cur = np.frombuffer(cur, dtype=np.uint8).reshape(pages, width)
+    page_slice = slice(page_offset, (bottom + 7) // 8)
+    diff = prev[page_slice, left:right] != cur[page_slice, left:right]
+
+    windows = []
+    for page in np.flatnonzero(diff.any(axis=1)):
+        cols = np.flatnonzero(diff[page])
+        page, col_start, col_end = (
+            int(page) + page_offset,
+            int(cols[0]) + left,
+            int(cols[-1]) + left,
+        )
+        if windows and windows[-1][1] == page - 1:
+            p0, p1, c0, c1 = windows[-1]
+            m0, m1 = min(c0, col_start), max(c1, col_end)
+            merged_cost = (page - p0 + 1) * (m1 - m0 + 1)
+            separate_cost = (
+                (p1 - p0 + 1) * (c1 - c0 + 1) + (col_end - col_start + 1) + overhead
+            )
+            if merged_cost <= separate_cost:
+                windows[-1] = (p0, page, m0, m1)
+                continue
+        windows.append((page, page, col_start, col_end))
+    return windows
+
+
+def pack_pages(
+    img: Union[Image.Image, np.ndarray], out: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Pack a 1-bit image into the SSD1306 page buffer layout in one vectorized step.
+
+    Each byte holds a column of 8 vertical pixels, least significant bit on top, and
+    pages are stored top to bottom. Accepts a mode "1" `Image` or a (height, width)
+    bool `ndarray`; when `out` is given the packed bytes are written into it.
+    """
+    if isinstance(img, Image.Image) and img.mode != "1":
+        img = img.convert("1")
+    pixels = np.asarray(img, dtype=bool)
+    height, width = pixels.shape
+    packed = np.packbits(
+        pixels.reshape(height // 8, 8, width), axis=1, bitorder="little"
+    ).reshape(height // 8, width)
+    if out is None:
+        return packed
+    np.copyto(out, packed)
+    return out
 
 
 class Display:
-    def __init__(self):
-        i2c = busio.I2C(board.SCL, board.SDA)
-        self.display = adafruit_ssd1306.SSD1306_I2C(128, 64, i2c)
+    def __init__(self, width=128, height=64, driver=None):
+        """`driver` defaults to an I2C `adafruit_ssd1306.SSD1306_I2C`; anything with
+        the same `buffer`/`show`/`write_cmd`/`i2c_device` API can stand in.
+        """
+        if driver is None:
+            # Imported here so modules using the helpers above load off-device
+            import board
+            import busio
+            import adafruit_ssd1306
+
+            i2c = busio.I2C(board.SCL, board.SDA)
+            driver = adafruit_ssd1306.SSD1306_I2C(width, height, i2c)
+        self.display = driver
+        self.width = width
+        self.pages = height // 8
+        # Writable (pages, width) view over the driver's buffer for `pack_pages`
+        self.page_buffer = np.frombuffer(self.framebuffer, dtype=np.uint8).reshape(
+            self.pages, self.width
+        )
+
+        # Copy of the page buffer the controller currently shows, None forces a full push
+        self.sent_buffer: Optional[bytearray] = None
+
+    @property
+    def framebuffer(self) -> memoryview:
+        """The driver's page buffer, without the leading I2C control byte."""
+        return memoryview(self.display.buffer)[1:]
 
     def clear_display(self):
         self.display.fill(0)
         self.display.show()
+        self.sent_buffer = bytearray(self.width * self.pages)
 
-    def display_img(self, img: Image, clear=False):
+    def display_img(
+        self,
+        img: Union[Image.Image, np.ndarray],
+        clear=False,
+        region: Optional[Region] = None,
+    ):
+        """Show `img`. `region`, if given, bounds everything that changed since the
+        previous image and limits the diff to it.
+        """
         if clear:
             self.clear_display()
-        self.display.image(img)
-        self.display.show()
+        pack_pages(img, out=self.page_buffer)
+        self.flush(region)
+
+    def flush(self, region: Optional[Region] = None):
+        """Push the framebuffer, sending only the pages/columns that changed since the last push."""
+        start = profiler.start()
+        self.push(region)
+        profiler.stop("display.flush", start)
+
+    def push(self, region: Optional[Region] = None):
+        framebuffer = self.framebuffer
+        if self.sent_buffer is None:
+            self.display.show()
+            self.sent_buffer = bytearray(framebuffer)
+            return
+
+        windows = changed_windows(
+            self.sent_buffer, framebuffer, self.width, self.pages, region=region
+        )
+        if not windows:
+            return
+        cost = sum(
+            (p1 - p0 + 1) * (c1 - c0 + 1) + WINDOW_OVERHEAD_BYTES
+            for p0, p1, c0, c1 in windows
+        )
+        if cost >= len(framebuffer):
+            self.display.show()
+        else:
+            for window in windows:
+                self.write_window(*window)
+        self.sent_buffer[:] = framebuffer
+
+    def write_window(self, page_start, page_end, col_start, col_end):
+        """Send one rectangle of the framebuffer through the controller's address window."""
+        for cmd in (
+            SET_COL_ADDR,
+            col_start,
+            col_end,
+            SET_PAGE_ADDR,
+            page_start,
+            page_end,
+        ):
+            self.display.write_cmd(cmd)
+
+        data = (
+            b"\x40"
+            + self.page_buffer[
+                page_start : page_end + 1, col_start : col_end + 1
+            ].tobytes()
+        )
+        with self.display.i2c_device:
+            self.display.i2c_device.write(data)
+
+
+class DisplayWriter:
+    """Pushes frames to a `Display` from a dedicated thread.
+
+    Frames are packed into a spare page buffer by `submit` and handed over through a
+    single latest-frame slot, so the caller can composite the next frame while the
+    previous one is on the bus. A frame replaced before the writer picks it up is
+    dropped instead of queued.
+    """
+
+    def __init__(self, display: Display):
+        self.display = display
+        self.back_buffer = np.zeros_like(display.page_buffer)
+        self.pending_buffer = np.zeros_like(display.page_buffer)
+        self.has_pending = False
+        # Union of the dirty regions of every frame folded into the pending one
+        self.pending_region: Optional[Region] = None
+        # Called once the pending frame, or one replacing it, is on the display
+        self.pending_callbacks: List[Callable[[], None]] = []
+        self.condition = Condition()
+
+        self.written_frames = 0
+        self.dropped_frames = 0
+
+        self.stop_thread = False
+        self.thread: Optional[Thread] = None
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.stop_thread = False
+        self.thread = Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.stop_thread = True
+            self.condition.notify()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def submit(
+        self,
+        img: Union[Image.Image, np.ndarray],
+        region: Optional[Region] = None,
+        on_flushed: Optional[Callable[[], None]] = None,
+    ):
+        """Queue `img` as the latest frame, replacing any frame not yet written.
+        `region` bounds what changed since the previously submitted frame, and
+        `on_flushed` is called once it, or a later frame, has been written.
+        """
+        pack_pages(img, out=self.back_buffer)
+        with self.condition:
+            if self.has_pending:
+                self.dropped_frames += 1
+                # The replaced frame's changes still have to reach the display
+                if region and self.pending_region:
+                    region = union_regions([region, self.pending_region])
+                else:
+                    region = None
+            self.back_buffer, self.pending_buffer = (
+                self.pending_buffer,
+                self.back_buffer,
+            )
+            self.pending_region = region
+            if on_flushed:
+                self.pending_callbacks.append(on_flushed)
+            self.has_pending = True
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.has_pending and not self.stop_thread:
+                    self.condition.wait()
+                if self.stop_thread:
+                    return
+                np.copyto(self.display.page_buffer, self.pending_buffer)
+                region = self.pending_region
+                callbacks, self.pending_callbacks = self.pending_callbacks, []
+                self.has_pending = False
+            self.display.flush(region)
+            self.written_frames += 1
+            for callback in callbacks:
+                callback()
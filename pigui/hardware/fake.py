@@ -0,0 +1,172 @@
+"""In-memory stand-ins for the display, GPIO controllers and camera.
+
+They run the real `Display`, `MasterController` and `Camera` code paths on top of
+fake devices, so the UI can be rendered and benchmarked without a Pi.
+"""
+
+import threading
+import time
+from io import BytesIO
+from types import SimpleNamespace
+from typing import Iterable, Optional, Tuple
+import numpy as np
+from PIL import Image
+from pigui.hardware.camera import Camera
+from pigui.hardware.controller import MasterController
+from pigui.hardware.display import Display, pack_pages
+from pigui.hardware.gpio import SimulatedGPIO
+from pigui.utils.constants import screen_frame_rate
+
+
+class FakeSSD1306:
+    """Stand-in for `adafruit_ssd1306.SSD1306_I2C` that counts bus traffic.
+
+    With `bus_speed` in bits/s, writes take as long as on a real I2C bus (9 clocks
+    per byte, acknowledge included).
+    """
+
+    def __init__(self, width=128, height=64, bus_speed: Optional[int] = None):
+        self.width = width
+        self.height = height
+        # Leading I2C control byte, as in the real driver
+        self.buffer = bytearray(1 + width * height // 8)
+        self.buffer[0] = 0x40
+        self.i2c_device = self
+        self.bus_speed = bus_speed
+
+        self.shows = 0
+        self.commands = 0
+        self.bytes_written = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def write(self, data: bytes):
+        self.bytes_written += len(data)
+        if self.bus_speed:
+            time.sleep(len(data) * 9 / self.bus_speed)
+
+    def write_cmd(self, cmd: int):
+        self.commands += 1
+        self.bytes_written += 2
+
+    def fill(self, color: int):
+        self.buffer[1:] = (b"\xff" if color else b"\x00") * (len(self.buffer) - 1)
+
+    def image(self, img: Image.Image):
+        pages = np.frombuffer(memoryview(self.buffer)[1:], dtype=np.uint8)
+        pack_pages(img, out=pages.reshape(self.height // 8, self.width))
+
+    def show(self):
+        self.shows += 1
+        self.write(self.buffer)
+
+
+class FakeDisplay(Display):
+    """A `Display` over a `FakeSSD1306`; `display.bytes_written` is the bus traffic."""
+
+    def __init__(self, width=128, height=64, bus_speed: Optional[int] = None):
+        super().__init__(width, height, driver=FakeSSD1306(width, height, bus_speed))
+
+
+class FakeController(MasterController):
+    """A `MasterController` on `SimulatedGPIO`, with helpers to drive its inputs."""
+
+    def __init__(self):
+        super().__init__(SimulatedGPIO())
+        self.backend: SimulatedGPIO = self.dispatcher.backend
+
+    def pin(self, controller: str, event: str) -> int:
+        return getattr(self, controller).event_pins[event]
+
+    def press(self, controller: str, event: str):
+        self.backend.press(self.pin(controller, event))
+
+    def release(self, controller: str, event: str):
+        self.backend.release(self.pin(controller, event))
+
+    def click(self, controller: str, event: str):
+        """Press and release, e.g. `click("joystick", "on_press")`."""
+        self.backend.click(self.pin(controller, event))
+
+
+class FakePiCamera:
+    """Stand-in for `picamera.PiCamera` producing a moving gradient.
+
+    Preview frames are paced to `framerate` like the real video port, and stills
+    are JPEGs encoded at the current resolution.
+    """
+
+    def __init__(self):
+        self.resolution: Tuple[int, int] = (128, 64)
+        self.framerate = screen_frame_rate
+        self.frame = SimpleNamespace(complete=True)
+        self.frame_count = 0
+        self.closed = False
+        self.recording_stop = threading.Event()
+        self.recording_thread = None
+
+    def luma(self, resolution: Tuple[int, int]) -> np.ndarray:
+        width, height = resolution
+        self.frame_count += 1
+        x = np.arange(width, dtype=np.uint16) + self.frame_count * 4
+        return np.broadcast_to((x % 256).astype(np.uint8), (height, width))
+
+    def jpeg(self, resolution: Tuple[int, int]) -> bytes:
+        data = BytesIO()
+        Image.fromarray(np.ascontiguousarray(self.luma(resolution))).save(
+            data, format="jpeg"
+        )
+        return data.getvalue()
+
+    def capture(self, output, format="jpeg", **kwargs):
+        self.write_output(output, self.jpeg(self.resolution))
+
+    def capture_sequence(self, outputs: Iterable, format="jpeg", resize=None, **kwargs):
+        resolution = resize or self.resolution
+        for output in outputs:
+            if format == "yuv":
+                # Luminance plane first, chroma planes are left as they are
+                luma = self.luma(resolution).ravel()
+                output[: luma.size] = luma
+                time.sleep(1 / self.framerate)
+            else:
+                self.write_output(output, self.jpeg(resolution))
+
+    def start_recording(self, output, format="mjpeg", **kwargs):
+        self.recording_stop.clear()
+
+        def record():
+            while not self.recording_stop.wait(1 / self.framerate):
+                output.write(self.jpeg(self.resolution))
+
+        self.recording_thread = threading.Thread(target=record, daemon=True)
+        self.recording_thread.start()
+
+    def stop_recording(self, **kwargs):
+        self.recording_stop.set()
+        if self.recording_thread:
+            self.recording_thread.join()
+            self.recording_thread = None
+
+    def close(self):
+        self.stop_recording()
+        self.closed = True
+
+    @staticmethod
+    def write_output(output, data: bytes):
+        if isinstance(output, str):
+            with open(output, "wb") as f:
+                f.write(data)
+        else:
+            output.write(data)
+
+
+class FakeCamera(Camera):
+    """A `Camera` over a `FakePiCamera`."""
+
+    def __init__(self, image_resolution=(1920, 1080), zsl=False):
+        super().__init__(image_resolution, FakePiCamera(), zsl)
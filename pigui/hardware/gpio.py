@@ -0,0 +1,108 @@
+import time
+from abc import ABC, abstractmethod
+from threading import Lock
+from typing import Callable, Dict, Optional
+
+# Pin levels
+LOW = 0
+HIGH = 1
+
+# callback(pin, level, timestamp), timestamp taken from `time.monotonic()`
+EdgeCallback = Callable[[int, int, float], None]
+
+
+class GPIOBackend(ABC):
+    """The subset of GPIO the controllers need: inputs and edge notifications."""
+
+    @abstractmethod
+    def setup_input(self, pin: int, pull_up=True):
+        pass
+
+    @abstractmethod
+    def input(self, pin: int) -> int:
+        pass
+
+    @abstractmethod
+    def watch(self, pin: int, callback: EdgeCallback):
+        """Call `callback` on every rising and falling edge of `pin`, bounces
+        included; debouncing is left to the caller.
+        """
+
+    @abstractmethod
+    def unwatch(self, pin: int):
+        pass
+
+    def cleanup(self):
+        pass
+
+
+class RPiGPIO(GPIOBackend):
+    """Backend using RPi.GPIO edge detection (`add_event_detect`)."""
+
+    def __init__(self):
+        import RPi.GPIO as GPIO
+
+        self.GPIO = GPIO
+        GPIO.setmode(GPIO.BCM)
+
+    def setup_input(self, pin, pull_up=True):
+        pull = self.GPIO.PUD_UP if pull_up else self.GPIO.PUD_DOWN
+        self.GPIO.setup(pin, self.GPIO.IN, pull_up_down=pull)
+
+    def input(self, pin):
+        return self.GPIO.input(pin)
+
+    def watch(self, pin, callback):
+        def on_edge(channel):
+            timestamp = time.monotonic()
+            callback(channel, self.GPIO.input(channel), timestamp)
+
+        # No `bouncetime`: RPi.GPIO drops edges inside it, the final release included
+        self.GPIO.add_event_detect(pin, self.GPIO.BOTH, callback=on_edge)
+
+    def unwatch(self, pin):
+        self.GPIO.remove_event_detect(pin)
+
+    def cleanup(self):
+        self.GPIO.cleanup()
+
+
+class SimulatedGPIO(GPIOBackend):
+    """In-memory backend for running without a Pi. Pins idle high (released)."""
+
+    def __init__(self):
+        self.levels: Dict[int, int] = {}
+        self.watchers: Dict[int, EdgeCallback] = {}
+        self.lock = Lock()
+
+    def setup_input(self, pin, pull_up=True):
+        self.levels.setdefault(pin, HIGH)
+
+    def input(self, pin):
+        return self.levels.get(pin, HIGH)
+
+    def watch(self, pin, callback):
+        self.watchers[pin] = callback
+
+    def unwatch(self, pin):
+        self.watchers.pop(pin, None)
+
+    def set_level(self, pin: int, level: int, timestamp: Optional[float] = None):
+        """Drive `pin` to `level`, firing its edge callback if the level changed."""
+        with self.lock:
+            if self.levels.get(pin, HIGH) == level:
+                return
+            self.levels[pin] = level
+        callback = self.watchers.get(pin)
+        if callback:
+            callback(pin, level, time.monotonic() if timestamp is None else timestamp)
+
+    def press(self, pin: int, timestamp: Optional[float] = None):
+        self.set_level(pin, LOW, timestamp)
+
+    def release(self, pin: int, timestamp: Optional[float] = None):
+        self.set_level(pin, HIGH, timestamp)
+
+    def click(self, pin: int):
+        self.press(pin)
+        self.release(pin)
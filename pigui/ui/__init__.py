@@ -1,69 +1,130 @@
+import threading
 import time
 from abc import ABC, abstractmethod
-from threading import Thread
+from functools import partial
 from typing import Callable, Dict, List, Tuple, Union, Optional
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont
-from pigui.hardware.controller import MasterController
-from pigui.hardware.display import Display
-from pigui.utils.constants import font
+from pigui.hardware.controller import Controller, InputEvent, MasterController
+from pigui.hardware.display import Display, DisplayWriter
+from pigui.ui.scheduler import (
+    EventScheduler,
+    FixedTimestep,
+    FrameScheduler,
+    Job,
+    event_scheduler,
+)
+from pigui.utils.constants import font, screen_frame_rate
+from pigui.utils.latency import latency_tracer
+from pigui.utils.profiler import profiler, resident_memory
+from pigui.utils.region import Region, intersect_regions, union_regions
 
 
 class State:
     def __init__(self, state=None):
         self.state = state
+        self.observers: List[Callable] = []
 
     def update(self, new_state):
         self.state = new_state
+        latency_tracer.mark_state()
+        for observer in list(self.observers):
+            observer(new_state)
+
+    def subscribe(self, observer: Callable) -> Callable:
+        """Call `observer(new_state)` on every update. Returns an unsubscribe function."""
+        self.observers.append(observer)
+
+        def unsubscribe():
+            if observer in self.observers:
+                self.observers.remove(observer)
+
+        return unsubscribe
 
 
 ####################################################################################
 
 
+def callback_key(callback: Callable) -> str:
+    """Profiler key of an event callback, e.g. `listener.Menu.next_item`."""
+    name = getattr(callback, "__qualname__", None) or type(callback).__name__
+    return f"listener.{name}"
+
+
 class EventListener:
+    """Polls `event_callback` every `sleep` seconds as a job on the shared `EventScheduler`.
+
+    Callbacks must not block unless the listener is created with `blocking`, which
+    runs its polls on the scheduler's worker pool.
+
+    Events can name a controller input, e.g. "joystick.on_up", resolved through the
+    document's controller on `start` so GPIO isn't set up before it's needed.
+    """
+
     def __init__(
         self,
-        event_callback: List[Tuple[Union[bool, Callable], Callable]],
+        event_callback: List[Tuple[Union[bool, str, Callable], Callable]],
         sleep=0.1,
         debounce=None,
+        scheduler: Optional[EventScheduler] = None,
+        blocking=False,
     ):
         self.event_callback = event_callback
         self.sleep = sleep
-
-        self.stop_thread = False
+        self.scheduler = scheduler or event_scheduler
+        self.blocking = blocking
+        self.job: Optional[Job] = None
+        # Set by `Component.register_event_listener`, resolves controller names
+        self.document: Optional["Document"] = None
+        self.events: List[Union[bool, Callable]] = []
 
         self.debounce_sec = debounce
         self.debounce_times = [0 for _ in self.event_callback] if debounce else None
 
     def start(self):
-        self.stop_thread = False
-
-        def target():
-            while not self.stop_thread:
-                for ix, (event, callback) in enumerate(self.event_callback):
-                    event_triggered = event if isinstance(event, bool) else event()
-                    if not event_triggered:
-                        continue
-                    # Event triggered -> check whether debounce or not
-                    cur_time = time.time()
-                    is_debounce = (
-                        False
-                        if not self.debounce_sec
-                        else cur_time - self.debounce_times[ix] < self.debounce_sec
-                    )
-                    if is_debounce:
-                        continue
-
-                    callback()
-                    # Update debounce_times
-                    if self.debounce_sec:
-                        self.debounce_times[ix] = cur_time
-                time.sleep(self.sleep)
-
-        thread = Thread(target=target)
-        thread.start()
+        # Already running -> don't stack a second job
+        if self.job:
+            return
+        self.events = [self.resolve(event) for event, _ in self.event_callback]
+        self.job = self.scheduler.schedule(
+            self.poll, self.sleep, blocking=self.blocking
+        )
 
     def stop(self):
-        self.stop_thread = True
+        if self.job:
+            self.scheduler.cancel(self.job)
+            self.job = None
+
+    def resolve(self, event):
+        """`event`, or the controller input it names, e.g. "joystick.on_up"."""
+        if not isinstance(event, str):
+            return event
+        controller, _, name = event.partition(".")
+        return getattr(getattr(self.document.controller, controller), name)
+
+    def poll(self):
+        for ix, ((_, callback), event) in enumerate(
+            zip(self.event_callback, self.events)
+        ):
+            event_triggered = event if isinstance(event, bool) else event()
+            if not event_triggered:
+                continue
+            # Event triggered -> check whether debounce or not
+            cur_time = time.time()
+            is_debounce = (
+                False
+                if not self.debounce_sec
+                else cur_time - self.debounce_times[ix] < self.debounce_sec
+            )
+            if is_debounce:
+                continue
+
+            start = profiler.start()
+            callback()
+            profiler.stop(callback_key(callback), start)
+            # Update debounce_times
+            if self.debounce_sec:
+                self.debounce_times[ix] = cur_time
 
     def on(self, func):
         def wrapper(*args, **kwargs):
@@ -73,31 +134,112 @@ class EventListener:
         return wrapper
 
 
+class InputListener(EventListener):
+    """Edge-triggered counterpart of `EventListener`.
+
+    Takes `(controller, event, callback)` tuples, e.g. `("joystick", "on_up", fn)`,
+    and subscribes the callbacks to the controller's press (or release) edges while
+    started instead of polling. Controllers given by name are looked up on the
+    document's controller on `start`. With `pass_event` callbacks receive the
+    `InputEvent`.
+    """
+
+    def __init__(
+        self,
+        event_callback: List[Tuple[Union[Controller, str], str, Callable]],
+        edge="press",
+        debounce=None,
+        pass_event=False,
+    ):
+        super().__init__(event_callback, debounce=debounce)
+        self.edge = edge
+        self.pass_event = pass_event
+        self.unsubscribers: List[Callable] = []
+
+    def start(self):
+        if self.unsubscribers:
+            return
+        for ix, (controller, event, _) in enumerate(self.event_callback):
+            if isinstance(controller, str):
+                controller = getattr(self.document.controller, controller)
+            self.unsubscribers.append(
+                controller.subscribe(event, partial(self.dispatch, ix), self.edge)
+            )
+
+    def stop(self):
+        for unsubscribe in self.unsubscribers:
+            unsubscribe()
+        self.unsubscribers = []
+
+    def dispatch(self, ix: int, event: InputEvent):
+        if self.debounce_sec:
+            if event.timestamp - self.debounce_times[ix] < self.debounce_sec:
+                return
+            self.debounce_times[ix] = event.timestamp
+        callback = self.event_callback[ix][2]
+        start = profiler.start()
+        if self.pass_event:
+            callback(event)
+        else:
+            callback()
+        profiler.stop(callback_key(callback), start)
+
+
 ####################################################################################
 
 
 class Component(ABC):
+    # Retained components are only re-rendered after `invalidate()`, others every frame
+    retained = False
+
     def __init__(self, document):
         self.document = document
         self.event_listeners = []
+        # Regions changed since the last render, None standing for the whole component
+        self.dirty_regions: List[Optional[Region]] = [None]
 
     def get_states(self) -> dict:
         return {k: v.state for k, v in self.__dict__.items() if isinstance(v, State)}
 
-    def get_bounding_region(self) -> Tuple[int, int, int, int]:
+    def get_bounding_region(self) -> Region:
         return (0, 0, 128, 64)
 
+    def invalidate(self, region: Optional[Region] = None):
+        """Mark `region` (screen coordinates, default the whole component) for re-render."""
+        self.dirty_regions.append(region)
+        latency_tracer.mark_state()
+
+    def update(self):
+        """Called once per frame, before rendering, while the component's frame is
+        shown. Apply state that arrived in the background here and `invalidate`.
+        """
+
+    def take_dirty_regions(self) -> List[Region]:
+        """Return and reset the regions to re-composite this frame."""
+        bounding_region = self.get_bounding_region()
+        if not self.retained:
+            return [bounding_region]
+        regions, self.dirty_regions = self.dirty_regions, []
+        return [bounding_region if r is None else r for r in regions]
+
     @abstractmethod
-    def render(self) -> Optional[Image.Image]:
+    def render(self) -> Optional[Union[Image.Image, np.ndarray]]:
+        """Return a mode "1" image, or a (height, width) bool array, of the component."""
         pass
 
+    def close(self):
+        """Release resources held outside the component, e.g. hardware. Called when
+        its frame is evicted from the document.
+        """
+
     def register_event_listener(
         self, event_listener: Union[EventListener, List[EventListener]]
     ):
         if isinstance(event_listener, EventListener):
-            self.event_listeners.append(event_listener)
-        else:
-            self.event_listeners.extend(event_listener)
+            event_listener = [event_listener]
+        for listener in event_listener:
+            listener.document = self.document
+            self.event_listeners.append(listener)
 
     def as_frame(self, frame_name=None):
         frame = Frame(components=[self], frame_name=frame_name)
@@ -130,6 +272,12 @@ class Frame(ABC):
         self.component_states = {}
         self.event_listeners: List[EventListener] = []
 
+        # Retained composition: last output of every component and the composed frame
+        self.image = Image.new("1", (128, 64))
+        self.layers: Dict[Component, Union[Image.Image, np.ndarray]] = {}
+        # Union of the regions re-composited by the last `render`
+        self.dirty_region: Optional[Region] = None
+
         if components:
             for comp in components:
                 self.components.append(comp)
@@ -154,65 +302,265 @@ class Frame(ABC):
         for listener in self.event_listeners:
             listener.stop()
 
-    def render(self) -> Optional[Image.Image]:
-        image = Image.new("1", (128, 64))
+    def invalidate(self):
+        """Force every component to re-render, e.g. when the frame is shown again."""
+        for component in self.components:
+            component.invalidate()
 
-        # Control whether return a new Image or none
-        is_empty = True
+    def close(self):
+        for component in self.components:
+            component.close()
 
-        # Layer components over one another
+    def render(self) -> Optional[Union[Image.Image, np.ndarray]]:
+        """Re-render dirty components and re-composite only the regions they changed.
+        Returns None when nothing changed since the last call.
+        """
+        dirty = []
         for component in self.components:
+            component.update()
+            regions = component.take_dirty_regions()
+            if not regions:
+                continue
+            start = profiler.start()
             component_img = component.render()
-            if component_img:
-                image.paste(component_img, component.get_bounding_region())
-                is_empty = False
-        return image if not is_empty else None
+            profiler.stop(f"render.{type(component).__name__}", start)
+            # None -> nothing new, keep showing the last output
+            if component_img is None:
+                continue
+            self.layers[component] = component_img
+            dirty.extend(regions)
+
+        self.dirty_region = union_regions(dirty)
+        if self.dirty_region is None:
+            return None
+
+        # A lone array layer goes straight to the display packer
+        if len(self.components) == 1 and isinstance(
+            self.layers[self.components[0]], np.ndarray
+        ):
+            return self.layers[self.components[0]]
+
+        # Layer components over one another, within the dirty region only
+        start = profiler.start()
+        self.image.paste(0, self.dirty_region)
+        for component in self.components:
+            layer = self.layers.get(component)
+            if layer is None:
+                continue
+            if isinstance(layer, np.ndarray):
+                layer = Image.fromarray(layer)
+            left, top, _, _ = bounding_region = component.get_bounding_region()
+            region = intersect_regions(bounding_region, self.dirty_region)
+            if region is None:
+                continue
+            x0, y0, x1, y1 = region
+            self.image.paste(
+                layer.crop((x0 - left, y0 - top, x1 - left, y1 - top)), region
+            )
+        profiler.stop("frame.paste", start)
+        return self.image
 
 
 ####################################################################################
 
 
 class Document:
-    def __init__(self, width=128, height=64):
-        self.displayer = Display()
-        self.controller = MasterController()
+    def __init__(
+        self,
+        width=128,
+        height=64,
+        displayer: Optional[Display] = None,
+        controller: Optional[MasterController] = None,
+        frame_idle_timeout: Optional[float] = 60.0,
+        memory_budget: Optional[int] = None,
+    ):
+        """`displayer` and `controller` default to the real hardware, opened on
+        first use; pass fakes from `pigui.hardware.fake` to run without a Pi.
+
+        Frames packed as factories are evicted once they haven't been shown for
+        `frame_idle_timeout` seconds, or least recently used first while the process
+        RSS exceeds `memory_budget` bytes, and rebuilt when shown again.
+        """
+        self.width = width
+        self.height = height
+        self._displayer = displayer
+        self._controller = controller
+        # Set by `main_loop(pipelined=True)` to push frames from a separate thread
+        self.display_writer: Optional[DisplayWriter] = None
+        # Frame pacing; components can read `scheduler.frame_budget`/`time_remaining()`
+        self.scheduler = FrameScheduler()
         self.font = font
 
         self.components = []
         self.component_state = {}
 
+        # Built frames, and factories building the ones packed lazily
         self.frames: Dict[str, Frame] = {}
+        self.frame_factories: Dict[str, Callable[[], Frame]] = {}
+        self.frame_last_used: Dict[str, float] = {}
+        self.frames_lock = threading.RLock()
+        self.frame_idle_timeout = frame_idle_timeout
+        self.memory_budget = memory_budget
 
         # Keep track of whether a frame's event listeners
         # e.g. if switch from Menu to an app, menu's event listener's would be stopped
         self.frame_event_listener_states: Dict[Frame, bool] = {}
 
         self.cur_frame_name = None
+        # `profiler` clock reading at the start of the last `render`
+        self.last_render_start = 0
+        # `time.monotonic()` when the first frame was on the display
+        self.first_frame_time: Optional[float] = None
+        # `time.monotonic()` when the controller was first asked for
+        self.controller_time: Optional[float] = None
+
+    @property
+    def displayer(self) -> Display:
+        # Opening I2C is deferred until there is something to show
+        if self._displayer is None:
+            self._displayer = Display(self.width, self.height)
+        return self._displayer
+
+    @property
+    def controller(self) -> MasterController:
+        # GPIO is set up by the first listener started, after the first frame
+        if self.controller_time is None:
+            self.controller_time = time.monotonic()
+        if self._controller is None:
+            self._controller = MasterController()
+        return self._controller
 
     def render(self):
         """Render document"""
-        cur_frame = self.frames[self.cur_frame_name]
-        self.start_frame_event_listeners(cur_frame)
+        start = profiler.start()
+        if self.last_render_start:
+            profiler.record("document.interval", start - self.last_render_start)
+        self.last_render_start = start
+        # Input events this frame is the first to reflect
+        traces = latency_tracer.take_ready(time.monotonic())
+
+        cur_frame = self.get_frame(self.cur_frame_name)
+        # Input waits until there's something on screen, keeping GPIO off the
+        # startup path
+        if self.first_frame_time is not None:
+            self.start_frame_event_listeners(cur_frame)
         cur_frame_img = cur_frame.render()
-        if cur_frame_img:
-            self.displayer.display_img(cur_frame_img)
-
-    def pack_frame(self, frame_name: str, frame: Frame):
+        # Events that changed nothing on screen aren't traced further
+        if cur_frame_img is not None:
+            latency_tracer.rendered(traces)
+            if self.display_writer:
+                self.display_writer.submit(
+                    cur_frame_img,
+                    cur_frame.dirty_region,
+                    partial(self.on_flushed, traces),
+                )
+            else:
+                self.displayer.display_img(cur_frame_img, region=cur_frame.dirty_region)
+                self.on_flushed(traces)
+        profiler.stop("document.render", start)
+
+    def on_flushed(self, traces: list):
+        latency_tracer.flushed(traces)
+        if self.first_frame_time is None:
+            self.first_frame_time = time.monotonic()
+
+    def pack_frame(self, frame_name: str, frame: Union[Frame, Callable[[], Frame]]):
+        """Add `frame`, or a factory that builds it the first time it's shown."""
         # Assume the first frame added as the entry point
-        if frame_name in self.frames:
+        if frame_name in self.frames or frame_name in self.frame_factories:
             raise ValueError(f"Frame `{frame_name}` already exists.")
         if self.cur_frame_name is None:
             self.cur_frame_name = frame_name
-        self.frames[frame_name] = frame
+        if isinstance(frame, Frame):
+            self.frames[frame_name] = frame
+        else:
+            self.frame_factories[frame_name] = frame
+        self.frame_last_used[frame_name] = time.monotonic()
+
+    def get_frame(self, frame_name: str) -> Frame:
+        """The frame named `frame_name`, built from its factory if needed."""
+        with self.frames_lock:
+            frame = self.frames.get(frame_name)
+            factory = self.frame_factories.get(frame_name)
+        if frame is not None:
+            return frame
+        if factory is None:
+            raise ValueError(f"Frame `{frame_name}` not found.")
 
-    def goto_frame(self, frame_name):
-        # Before rendering new frame, remove current frame event listeners
-        cur_frame = self.frames[self.cur_frame_name]
-        self.remove_frame_event_listeners(cur_frame)
+        # Built outside the lock, constructors can be slow and `render` needs it
+        print(f"Building frame {frame_name}")
+        built = factory()
+        with self.frames_lock:
+            frame = self.frames.setdefault(frame_name, built)
+            self.frame_last_used[frame_name] = time.monotonic()
+        if frame is not built:
+            # Another thread built it first
+            built.close()
+        return frame
 
-        if frame_name not in self.frames:
+    def goto_frame(self, frame_name):
+        if frame_name not in self.frames and frame_name not in self.frame_factories:
             raise ValueError(f"Frame `{frame_name}` not found.")
-        self.cur_frame_name = frame_name
+        while True:
+            frame = self.get_frame(frame_name)
+            # Held so the main loop can't evict the frame while it's being selected
+            with self.frames_lock:
+                if self.frames.get(frame_name) is not frame:
+                    continue  # Evicted since it was built
+                # Before rendering new frame, remove current frame event listeners
+                cur_frame = self.frames.get(self.cur_frame_name)
+                if cur_frame is not None:
+                    self.remove_frame_event_listeners(cur_frame)
+
+                now = time.monotonic()
+                self.frame_last_used[self.cur_frame_name] = now
+                self.frame_last_used[frame_name] = now
+                self.cur_frame_name = frame_name
+                break
+        # The display still shows the previous frame, redraw everything
+        frame.invalidate()
+
+    def evict_frame(self, frame_name: str):
+        """Release a frame built from a factory; it's rebuilt when shown again."""
+        with self.frames_lock:
+            if (
+                frame_name not in self.frame_factories
+                or frame_name == self.cur_frame_name
+            ):
+                return
+            frame = self.frames.pop(frame_name, None)
+        if frame is None:
+            return
+        frame.stop_event_listeners()
+        self.frame_event_listener_states.pop(frame, None)
+        frame.close()
+        print(f"Frame {frame_name} evicted")
+
+    def evict_idle_frames(self):
+        """Evict built factory frames that have idled past `frame_idle_timeout`, and
+        while over `memory_budget` the least recently used one. RSS lags behind a
+        `close`, so a single pass evicts at most one frame for the budget and the
+        next pass measures again.
+        """
+        now = time.monotonic()
+        over_budget = (
+            self.memory_budget is not None
+            and (resident_memory() or 0) > self.memory_budget
+        )
+        idle_frames = sorted(
+            (self.frame_last_used[name], name)
+            for name in list(self.frames)
+            if name in self.frame_factories and name != self.cur_frame_name
+        )
+        for last_used, name in idle_frames:
+            if (
+                self.frame_idle_timeout is not None
+                and now - last_used > self.frame_idle_timeout
+            ):
+                self.evict_frame(name)
+            elif over_budget:
+                self.evict_frame(name)
+                over_budget = False
 
     def start_frame_event_listeners(self, frame: Frame):
         if (
@@ -226,23 +574,47 @@ class Document:
         frame.stop_event_listeners()
         self.frame_event_listener_states[frame] = False
 
-    def main_loop(self, fps: bool = True):
+    def main_loop(
+        self,
+        fps: bool = True,
+        pipelined: bool = False,
+        target_fps: Optional[float] = screen_frame_rate,
+    ):
+        """Render frames forever, paced to `target_fps` (None renders unthrottled).
+
+        With `pipelined`, frame N is written to the display on a writer thread while
+        frame N+1 is being composited; stale frames are dropped, never queued.
+        """
+        self.scheduler.set_target_fps(target_fps)
+        if pipelined:
+            self.display_writer = DisplayWriter(self.displayer)
+            self.display_writer.start()
+
         if fps:
             frames = 0
+            dropped_frames = 0
             start_time = time.time()
+        last_eviction = time.monotonic()
 
         while True:
+            self.scheduler.begin_frame()
             self.render()
+            self.scheduler.end_frame()
+            # Cheap, but there's no need to check every frame
+            if time.monotonic() - last_eviction >= 1.0:
+                self.evict_idle_frames()
+                last_eviction = time.monotonic()
             if not fps:
                 continue
             frames += 1
             elapsed_time = time.time() - start_time
             if elapsed_time >= 1.0:
                 fps = frames / elapsed_time
-                print(f"FPS: {fps:.2f}")
+                dropped = self.scheduler.dropped_frames - dropped_frames
+                print(f"FPS: {fps:.2f} (dropped {dropped})")
                 frames = 0
+                dropped_frames = self.scheduler.dropped_frames
                 start_time = time.time()
-            time.sleep(0.03)
 
 
 ####################################################################################
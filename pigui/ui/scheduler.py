@@ -0,0 +1,213 @@
+import heapq
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+from threading import Condition, Thread
+from typing import Callable, List, Optional, Tuple
+from pigui.utils.constants import screen_frame_rate
+
+
+class FrameScheduler:
+    """Paces a render loop to a target frame rate.
+
+    Each frame gets a fixed budget of `1 / target_fps` seconds. After rendering, the
+    loop sleeps only for whatever is left of that budget, and frames that overrun
+    their deadline are counted as dropped.
+    """
+
+    def __init__(self, target_fps: Optional[float] = screen_frame_rate):
+        self.set_target_fps(target_fps)
+        self.frame_start = None
+        self.deadline = None
+
+        self.frames = 0
+        self.dropped_frames = 0
+        self.last_frame_time = 0.0
+
+    def set_target_fps(self, target_fps: Optional[float]):
+        """A `target_fps` of None renders as fast as possible without sleeping."""
+        self.target_fps = target_fps
+        self.frame_budget = 1 / target_fps if target_fps else 0.0
+        self.deadline = None
+
+    def begin_frame(self):
+        self.frame_start = time.monotonic()
+        if self.deadline is None:
+            self.deadline = self.frame_start + self.frame_budget
+
+    def time_remaining(self) -> float:
+        """Seconds left before the current frame's deadline."""
+        if self.deadline is None:
+            return self.frame_budget
+        return self.deadline - time.monotonic()
+
+    def end_frame(self):
+        """Sleep until the frame deadline, or account the frames missed overrunning it."""
+        now = time.monotonic()
+        self.last_frame_time = now - self.frame_start
+        self.frames += 1
+        if not self.frame_budget:
+            return
+
+        if now <= self.deadline:
+            time.sleep(self.deadline - now)
+            self.deadline += self.frame_budget
+            return
+
+        # Overran: drop the missed slots and restart the cadence from now
+        self.dropped_frames += int((now - self.deadline) / self.frame_budget) + 1
+        self.deadline = now + self.frame_budget
+
+
+class FixedTimestep:
+    """Advances a simulation in constant `1 / tick_rate` second ticks.
+
+    Real time elapsed between calls to `advance` is added to an accumulator that
+    is consumed one tick at a time, so the simulation runs at the same speed however
+    fast it is rendered. At most `max_ticks` run per call and any backlog beyond
+    that is discarded, so slow frames can't snowball into ever slower ones.
+    """
+
+    def __init__(self, tick_rate: float, max_ticks=5):
+        self.dt = 1 / tick_rate
+        self.max_ticks = max_ticks
+        self.accumulator = 0.0
+        self.last_time: Optional[float] = None
+
+        self.ticks = 0
+        self.skipped_ticks = 0
+
+    def reset(self):
+        """Forget elapsed time, e.g. after a pause, so it isn't caught up on."""
+        self.accumulator = 0.0
+        self.last_time = None
+
+    def advance(self, tick: Callable[[], None]) -> float:
+        """Run every tick due since the previous call.
+
+        Returns how far into the next tick the current time is, between 0 and 1, for
+        interpolating between the previous and current simulation state.
+        """
+        now = time.monotonic()
+        if self.last_time is None:
+            # First call after a reset starts with exactly one tick
+            self.last_time = now - self.dt
+        self.accumulator += now - self.last_time
+        self.last_time = now
+
+        ticks = 0
+        while self.accumulator >= self.dt:
+            if ticks == self.max_ticks:
+                skipped = int(self.accumulator / self.dt)
+                self.skipped_ticks += skipped
+                self.accumulator -= skipped * self.dt
+                break
+            tick()
+            ticks += 1
+            self.accumulator -= self.dt
+        self.ticks += ticks
+        return self.accumulator / self.dt
+
+
+class Job:
+    """A callback registered with an `EventScheduler`."""
+
+    def __init__(self, callback: Callable, interval: Optional[float], blocking=False):
+        self.callback = callback
+        self.interval = interval
+        self.blocking = blocking
+        self.cancelled = False
+        # A blocking job still running on the worker pool
+        self.running = False
+
+
+class EventScheduler:
+    """A single thread that runs every periodic callback.
+
+    Jobs live in a heap ordered by their next run time. Scheduling is a heap push
+    and cancelling only flags the job, which is discarded when it comes due, so
+    frames can register and drop their jobs on every navigation without spawning
+    threads.
+
+    Callbacks run on the scheduler thread must return quickly, since every other
+    job waits on them. Ones that block, on I/O or subprocesses, are scheduled with
+    `blocking` and run on a small worker pool instead, skipping a run while the
+    previous one is still going.
+    """
+
+    def __init__(self, workers=2):
+        self.heap: List[Tuple[float, int, Job]] = []
+        self.counter = count()
+        self.condition = Condition()
+        self.thread: Optional[Thread] = None
+        self.workers = workers
+        self.executor: Optional[ThreadPoolExecutor] = None
+
+    def schedule(
+        self,
+        callback: Callable,
+        interval: Optional[float] = None,
+        delay=0.0,
+        blocking=False,
+    ) -> Job:
+        """Run `callback` after `delay` seconds, then every `interval` seconds if given.
+        `blocking` callbacks run off the scheduler thread.
+        """
+        job = Job(callback, interval, blocking)
+        with self.condition:
+            self.push(time.monotonic() + delay, job)
+            if self.thread is None:
+                self.thread = Thread(target=self.run, daemon=True)
+                self.thread.start()
+        return job
+
+    def cancel(self, job: Job):
+        job.cancelled = True
+
+    def push(self, run_at: float, job: Job):
+        heapq.heappush(self.heap, (run_at, next(self.counter), job))
+        self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.heap:
+                    self.condition.wait()
+                run_at, _, job = self.heap[0]
+                if job.cancelled:
+                    heapq.heappop(self.heap)
+                    continue
+                delay = run_at - time.monotonic()
+                if delay > 0:
+                    self.condition.wait(delay)
+                    continue
+                heapq.heappop(self.heap)
+
+            if job.blocking:
+                if not job.running:
+                    job.running = True
+                    if self.executor is None:
+                        self.executor = ThreadPoolExecutor(self.workers)
+                    self.executor.submit(self.run_blocking, job)
+            else:
+                try:
+                    job.callback()
+                except Exception:
+                    traceback.print_exc()
+
+            if job.interval is not None and not job.cancelled:
+                with self.condition:
+                    self.push(max(run_at + job.interval, time.monotonic()), job)
+
+    def run_blocking(self, job: Job):
+        try:
+            job.callback()
+        except Exception:
+            traceback.print_exc()
+        finally:
+            job.running = False
+
+
+# Shared by every `EventListener` unless one is given explicitly
+event_scheduler = EventScheduler()
@@ -0,0 +1,215 @@
+"""Render benchmarks of every component on fake hardware.
+
+    python -m pigui.utils.benchmark --output bench.json
+    python -m pigui.utils.benchmark --baseline bench.json
+
+Each component is timed through `Component.render`, `Frame.render` and
+`Document.render`, reporting frame time percentiles and per-frame allocations as
+JSON, so two versions can be compared.
+"""
+
+import argparse
+import contextlib
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Sequence
+from pigui.hardware.fake import FakeCamera, FakeController, FakeDisplay
+from pigui.ui import Component, Document
+from pigui.utils.profiler import percentile
+
+
+def measure(fn: Callable, n=200, warmup=10) -> dict:
+    """Time `n` calls of `fn`, then trace the allocations of a tenth as many."""
+    for _ in range(warmup):
+        fn()
+
+    times = []
+    for _ in range(n):
+        start = time.perf_counter_ns()
+        fn()
+        times.append((time.perf_counter_ns() - start) / 1e6)
+    times.sort()
+
+    # A separate pass, tracing slows every allocation down
+    traced = max(1, n // 10)
+    peak_bytes = net_bytes = 0
+    tracemalloc.start()
+    for _ in range(traced):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        fn()
+        current, peak = tracemalloc.get_traced_memory()
+        peak_bytes += peak - before
+        net_bytes += current - before
+    tracemalloc.stop()
+
+    return {
+        "n": n,
+        "mean_ms": sum(times) / n,
+        "p50_ms": percentile(times, 50),
+        "p95_ms": percentile(times, 95),
+        "p99_ms": percentile(times, 99),
+        "max_ms": times[-1],
+        # Most memory allocated at once during a frame, and what it kept
+        "alloc_peak_bytes": peak_bytes / traced,
+        "alloc_net_bytes": net_bytes / traced,
+    }
+
+
+def fake_document() -> Document:
+    return Document(displayer=FakeDisplay(), controller=FakeController())
+
+
+def component_factories(image_directory: str) -> Dict[str, Callable]:
+    """`name`: `factory(document)` of every benchmarked component. Imports are
+    deferred so a component with missing dependencies only fails its own benchmark.
+    """
+
+    def menu(document):
+        from pigui.components.menu import Menu
+
+        return Menu(document)
+
+    def stats(document):
+        from pigui.components.stats import StatApp
+
+        return StatApp(document)
+
+    def chatgpt(document):
+        from pigui.components.chatgpt import ChatGPT
+
+        return ChatGPT(document)
+
+    def draw(document):
+        from pigui.components.draw import DrawApp
+
+        return DrawApp(document)
+
+    def mario(document):
+        from pigui.components.mario import Mario
+
+        return Mario(document)
+
+    def camera(document):
+        from pigui.components.camera import CameraApp
+
+        return CameraApp(document, image_directory, camera_factory=FakeCamera)
+
+    return {
+        "menu": menu,
+        "stats": stats,
+        "chatgpt": chatgpt,
+        "draw": draw,
+        "mario": mario,
+        "camera": camera,
+    }
+
+
+def benchmark_component(name: str, factory: Callable, n=200) -> dict:
+    document = fake_document()
+    component: Component = factory(document)
+    frame = component.as_frame(name)
+    document.pack_frame(name, frame)
+
+    # Sources such as the camera take a moment to produce their first frame
+    deadline = time.monotonic() + 2
+    while component.render() is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    def frame_render():
+        frame.invalidate()
+        frame.render()
+
+    bus = document.displayer.display
+    document_calls = 0
+
+    def document_render():
+        nonlocal document_calls
+        document_calls += 1
+        frame.invalidate()
+        document.render()
+
+    try:
+        results = {
+            "render": measure(component.render, n),
+            "frame": measure(frame_render, n),
+        }
+        bytes_before = bus.bytes_written
+        results["document"] = measure(document_render, n)
+        # Display bus traffic, the first frame is a full write
+        results["bus_bytes_per_frame"] = (
+            bus.bytes_written - bytes_before
+        ) / document_calls
+        return results
+    finally:
+        document.remove_frame_event_listeners(frame)
+        frame.close()
+
+
+def run(names: Sequence[str] = (), n=200) -> dict:
+    """Benchmark the components in `names`, all of them if empty."""
+    with tempfile.TemporaryDirectory() as image_directory:
+        factories = component_factories(image_directory)
+        results = {}
+        for name in names or factories:
+            try:
+                results[name] = benchmark_component(name, factories[name], n)
+            except Exception as e:
+                results[name] = {"error": f"{type(e).__name__}: {e}"}
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "benchmarks": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold=0.1) -> List[str]:
+    """Benchmarks whose p95 frame time grew by more than `threshold` since `baseline`."""
+    regressions = []
+    for name, stages in current["benchmarks"].items():
+        old_stages = baseline["benchmarks"].get(name, {})
+        for stage, result in stages.items():
+            old = old_stages.get(stage)
+            if not isinstance(result, dict) or not isinstance(old, dict):
+                continue
+            if result["p95_ms"] > old["p95_ms"] * (1 + threshold):
+                regressions.append(
+                    f"{name}.{stage}: p95 {old['p95_ms']:.3f} -> {result['p95_ms']:.3f} ms"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("components", nargs="*", help="Default: all components")
+    parser.add_argument("--n", type=int, default=200, help="Frames per benchmark")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", help="JSON report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    # Keep component logging out of a report printed to stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run(args.components, args.n)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+from functools import lru_cache
 from PIL import ImageFont
 
 # Text
@@ -7,11 +8,17 @@ text_line_height_px = 15
 text_lines = 4
 
 
+@lru_cache(maxsize=None)
+def load_font(path, size) -> ImageFont.FreeTypeFont:
+    """Load a FreeType face once per (path, size)."""
+    return ImageFont.truetype(path, size)
+
+
 class CustomFont(ImageFont.FreeTypeFont):
     """Wrapper class of ImageFont"""
 
     def resize(self, size) -> ImageFont.FreeTypeFont:
-        return ImageFont.truetype(self.path, size)
+        return load_font(self.path, size)
 
 
 font = CustomFont("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 15)
@@ -27,6 +34,12 @@ screen_frame_rate = 30
 game_bg_color = 0
 game_fg_color = 1
 game_speed_divisor_score = 10
+# Simulation ticks per second, independent of the display frame rate
+game_tick_rate = screen_frame_rate
+game_max_ticks_per_frame = 5
+# Chance of spawning an object on each tick
+game_coin_spawn_chance = 0.02
+game_block_spawn_chance = 0.01
 game_coin_min_h = 8
 game_coin_max_h = 8
 game_coin_min_w = 8
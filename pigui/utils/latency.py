@@ -0,0 +1,149 @@
+"""Input-to-photon latency tracing.
+
+Each `InputEvent` is traced through its callbacks, the first state change they
+make, the next `Document.render` and the display flush that puts the result on
+screen. Timestamps are `time.monotonic()`, the clock of `InputEvent.timestamp`.
+`pigui.utils.testing.measure_latency` runs a simulated session on fake hardware.
+"""
+
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Dict, List, Optional
+import numpy as np
+
+# Stage boundaries of a trace, in order
+STAGES = ("input", "callback", "state", "callback_end", "render", "rendered", "flushed")
+
+
+class Trace:
+    __slots__ = ("seq", "type", "times")
+
+    def __init__(self, seq: int, type: str, timestamp: float):
+        self.seq = seq
+        self.type = type
+        self.times: Dict[str, float] = {"input": timestamp}
+
+    def mark(self, stage: str, timestamp: Optional[float] = None):
+        # Keep the first occurrence, e.g. of several state changes
+        self.times.setdefault(
+            stage, time.monotonic() if timestamp is None else timestamp
+        )
+
+    @property
+    def latency(self) -> float:
+        return self.times["flushed"] - self.times["input"]
+
+
+class LatencyTracer:
+    """Follows input events until the frame showing their effect is on screen.
+
+    The input dispatcher calls `begin`/`end` around an event's callbacks, and state
+    changes made on that thread in between are attributed to it. Events whose
+    callbacks changed no state, e.g. debounced ones, are dropped; every other one is
+    carried by the next frame `Document` renders and completed once it's flushed.
+    """
+
+    def __init__(self, size=1024, enabled=True):
+        self.enabled = enabled
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        # Callbacks done, waiting for the next frame
+        self.ready: List[Trace] = []
+        self.completed = deque(maxlen=size)
+
+    def begin(self, event) -> Optional[Trace]:
+        if not self.enabled:
+            return None
+        trace = Trace(event.seq, event.type, event.timestamp)
+        trace.mark("callback")
+        self.local.trace = trace
+        return trace
+
+    def mark_state(self):
+        """Record a state change by the event being dispatched on this thread, if any."""
+        trace = getattr(self.local, "trace", None)
+        if trace:
+            trace.mark("state")
+
+    def end(self, trace: Optional[Trace]):
+        if trace is None:
+            return
+        self.local.trace = None
+        # Debounced or otherwise no-op events have no input-to-photon latency
+        if "state" not in trace.times:
+            return
+        trace.mark("callback_end")
+        with self.lock:
+            self.ready.append(trace)
+
+    def take_ready(self, render_start: float) -> List[Trace]:
+        """Traces whose callbacks ended before a frame starting at `render_start`."""
+        if not self.ready:
+            return []
+        with self.lock:
+            batch = [t for t in self.ready if t.times["callback_end"] <= render_start]
+            self.ready = [
+                t for t in self.ready if t.times["callback_end"] > render_start
+            ]
+        for trace in batch:
+            trace.mark("render", render_start)
+        return batch
+
+    def rendered(self, batch: List[Trace]):
+        now = time.monotonic()
+        for trace in batch:
+            trace.mark("rendered", now)
+
+    def flushed(self, batch: List[Trace]):
+        now = time.monotonic()
+        for trace in batch:
+            trace.mark("flushed", now)
+        self.completed.extend(batch)
+
+    def report(self) -> Dict[str, dict]:
+        """Latency distribution per event type, in ms, with the time spent in each stage."""
+        by_type: Dict[str, List[Trace]] = defaultdict(list)
+        for trace in list(self.completed):
+            by_type[trace.type].append(trace)
+
+        report = {}
+        for type, traces in sorted(by_type.items()):
+            report[type] = {
+                "count": len(traces),
+                "total": distribution([t.latency for t in traces]),
+                "stages": {
+                    f"{start}->{end}": distribution(
+                        [t.times[end] - t.times[start] for t in traces]
+                    )
+                    for start, end in stage_pairs(traces)
+                },
+            }
+        return report
+
+    def reset(self):
+        with self.lock:
+            self.ready = []
+            self.completed.clear()
+
+
+def stage_pairs(traces: List[Trace]):
+    """Consecutive stages every trace went through."""
+    stages = [s for s in STAGES if all(s in t.times for t in traces)]
+    return zip(stages, stages[1:])
+
+
+def distribution(seconds: List[float]) -> dict:
+    ms = np.array(seconds) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "max_ms": float(ms.max()),
+    }
+
+
+# Used by the input dispatcher, `Component` and `Document`
+latency_tracer = LatencyTracer()
@@ -0,0 +1,178 @@
+import mmap
+import os
+from io import BytesIO
+from threading import Condition, Lock, Thread
+from typing import Dict, List, Optional, Union
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+from pigui.hardware.camera import ImageProcessor
+from pigui.utils.constants import screen_height, screen_width
+
+INDEX_FILE = ".pigui_index"
+THUMBNAIL_FILE = ".pigui_thumbs"
+THUMBNAIL_BYTES = screen_width * screen_height // 8
+
+
+def make_thumbnail(img: Union[str, BytesIO], dither="bayer") -> np.ndarray:
+    """Screen sized 1-bit thumbnail of a JPEG, decoded at reduced scale."""
+    image = Image.open(img)
+    # Let the JPEG decoder downscale by up to 8x instead of decoding full size
+    image.draft("L", (screen_width, screen_height))
+    image = image.convert("L").resize((screen_width, screen_height))
+    return ImageProcessor.dither(np.asarray(image), dither)
+
+
+class PhotoIndex:
+    """Persistent index of captured images with a memory-mapped thumbnail cache.
+
+    The index is a sidecar text file with one file name per line, appended to as
+    photos are saved. Thumbnails are pre-dithered 1-bit bitmaps stored as fixed
+    size records in a second file, record `i` belonging to line `i`, so showing
+    one is an mmap slice rather than a JPEG decode.
+
+    Records are made by one background thread, in index order, so a first run over
+    a folder of photos doesn't hold up the UI; until a photo's record exists
+    `thumbnail` returns None. Photos that can't be decoded, e.g. deleted or half
+    written ones, are dropped from the index.
+    """
+
+    def __init__(self, directory=".", prefix="IMG", extension=".jpg"):
+        self.directory = directory
+        self.prefix = prefix
+        self.extension = extension
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self.thumbnail_path = os.path.join(directory, THUMBNAIL_FILE)
+        self.lock = Condition()
+
+        self.names: List[str] = []
+        self.thumbnails: Optional[mmap.mmap] = None
+        # Records in the thumbnail file, the first `thumbnail_count` names have one
+        self.thumbnail_count = 0
+        # Encoded images of photos added but not thumbnailed yet, saves a re-read
+        self.pending_images: Dict[str, BytesIO] = {}
+        self.next_num = 1
+        self.load()
+
+        self.thread = Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def __len__(self):
+        return len(self.names)
+
+    def image_num(self, name: str) -> int:
+        return int(name[len(self.prefix) : -len(self.extension)])
+
+    def load(self):
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                self.names = [line.strip() for line in f if line.strip()]
+        else:
+            # First run in this directory -> index what's already there, once
+            self.names = sorted(
+                (
+                    f
+                    for f in os.listdir(self.directory)
+                    if f.startswith(self.prefix)
+                    and f.endswith(self.extension)
+                    and f[len(self.prefix) : -len(self.extension)].isdigit()
+                ),
+                key=self.image_num,
+            )
+            with open(self.index_path, "w") as f:
+                f.writelines(f"{name}\n" for name in self.names)
+        if self.names:
+            self.next_num = max(self.image_num(name) for name in self.names) + 1
+
+        # Drop records past the index, e.g. of an interrupted save; the rest are
+        # filled in by `run`
+        if os.path.exists(self.thumbnail_path):
+            self.thumbnail_count = min(
+                os.path.getsize(self.thumbnail_path) // THUMBNAIL_BYTES,
+                len(self.names),
+            )
+        with open(self.thumbnail_path, "ab") as f:
+            f.truncate(self.thumbnail_count * THUMBNAIL_BYTES)
+        self.remap()
+
+    def remap(self):
+        if self.thumbnails:
+            self.thumbnails.close()
+            self.thumbnails = None
+        if os.path.getsize(self.thumbnail_path):
+            with open(self.thumbnail_path, "rb") as f:
+                self.thumbnails = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def run(self):
+        """Make the missing thumbnail records, in index order."""
+        while True:
+            with self.lock:
+                while self.thumbnail_count >= len(self.names):
+                    self.lock.wait()
+                name = self.names[self.thumbnail_count]
+                img = self.pending_images.pop(name, None)
+
+            try:
+                thumbnail = make_thumbnail(
+                    img if img is not None else os.path.join(self.directory, name)
+                )
+            except (OSError, UnidentifiedImageError) as e:
+                print(f"Dropping {name} from the photo index: {e}")
+                with self.lock:
+                    del self.names[self.thumbnail_count]
+                    self.write_index()
+                continue
+
+            with self.lock:
+                with open(self.thumbnail_path, "ab") as f:
+                    f.write(np.packbits(thumbnail).tobytes())
+                self.thumbnail_count += 1
+                self.remap()
+
+    def write_index(self):
+        path = self.index_path + ".tmp"
+        with open(path, "w") as f:
+            f.writelines(f"{name}\n" for name in self.names)
+        os.replace(path, self.index_path)
+
+    def allocate_name(self) -> str:
+        """Reserve the next file name, returned as a path in the directory."""
+        with self.lock:
+            name = f"{self.prefix}{self.next_num}{self.extension}"
+            self.next_num += 1
+        return os.path.join(self.directory, name)
+
+    def add(self, path: str, img: Optional[Union[str, BytesIO]] = None):
+        """Record a saved photo. `img` is its encoded data if already in memory."""
+        name = os.path.basename(path)
+        with self.lock:
+            with open(self.index_path, "a") as f:
+                f.write(f"{name}\n")
+            self.names.append(name)
+            if isinstance(img, BytesIO):
+                self.pending_images[name] = BytesIO(img.getvalue())
+            self.lock.notify()
+
+    def thumbnail(self, i: int) -> Optional[np.ndarray]:
+        """Thumbnail of the `i`-th photo as a (height, width) bool array, None while
+        it's still being made.
+        """
+        with self.lock:
+            if i >= self.thumbnail_count:
+                return None
+            record = self.thumbnails[i * THUMBNAIL_BYTES : (i + 1) * THUMBNAIL_BYTES]
+        pixels = np.unpackbits(np.frombuffer(record, dtype=np.uint8)).view(bool)
+        return pixels.reshape(screen_height, screen_width)
+
+
+_indexes: Dict[str, PhotoIndex] = {}
+# The camera and gallery can be built on different threads
+_indexes_lock = Lock()
+
+
+def get_photo_index(directory=".") -> PhotoIndex:
+    """The shared `PhotoIndex` of `directory`, so the camera and gallery stay in sync."""
+    key = os.path.abspath(directory)
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = PhotoIndex(directory)
+        return _indexes[key]
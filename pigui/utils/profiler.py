@@ -0,0 +1,126 @@
+import os
+import time
+from threading import Lock
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+
+
+class RingBuffer:
+    """The last `size` int64 samples, overwritten oldest first."""
+
+    def __init__(self, size: int):
+        self.samples = np.zeros(size, dtype=np.int64)
+        self.index = 0
+        self.count = 0
+
+    def add(self, value: int):
+        self.samples[self.index] = value
+        self.index = (self.index + 1) % len(self.samples)
+        self.count += 1
+
+    def values(self) -> np.ndarray:
+        """Stored samples, oldest first."""
+        if self.count < len(self.samples):
+            return self.samples[: self.count].copy()
+        return np.roll(self.samples, -self.index)
+
+
+class Profiler:
+    """Hot path timings, kept per key in fixed-size ring buffers.
+
+    Timings are `time.perf_counter_ns()` deltas, recorded with `start`/`stop` so
+    an instrumented call costs two clock reads and an array store:
+
+        start = profiler.start()
+        component.render()
+        profiler.stop("render.Menu", start)
+
+    Keys used by pigui: `render.<Component>` and `frame.paste` in `Frame.render`,
+    `display.flush` for the I2C push, `listener.<callback>` for event callbacks and
+    `document.render` for the whole frame and `document.interval` for the time
+    between frame starts.
+    """
+
+    def __init__(self, size=256, enabled=True):
+        self.size = size
+        self.enabled = enabled
+        self.buffers: Dict[str, RingBuffer] = {}
+        self.lock = Lock()
+
+    def start(self) -> int:
+        return time.perf_counter_ns() if self.enabled else 0
+
+    def stop(self, key: str, start: int):
+        if self.enabled:
+            self.record(key, time.perf_counter_ns() - start)
+
+    def record(self, key: str, value: int):
+        buffer = self.buffers.get(key)
+        if buffer is None:
+            with self.lock:
+                buffer = self.buffers.setdefault(key, RingBuffer(self.size))
+        buffer.add(value)
+
+    def samples(self, key: str) -> np.ndarray:
+        buffer = self.buffers.get(key)
+        return buffer.values() if buffer else np.zeros(0, dtype=np.int64)
+
+    def fps(self) -> float:
+        """Frame rate over the stored `document.interval`s."""
+        intervals = self.samples("document.interval")
+        if not len(intervals) or not intervals.mean():
+            return 0.0
+        return 1e9 / intervals.mean()
+
+    def stats(self, key: str) -> dict:
+        """Summary of `key`'s stored timings, in ms."""
+        ms = self.samples(key) / 1e6
+        if not len(ms):
+            return {"count": 0}
+        p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+        return {
+            "count": self.buffers[key].count,
+            "mean_ms": float(ms.mean()),
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+            "max_ms": float(ms.max()),
+        }
+
+    def histogram(self, key: str, bins=20) -> dict:
+        counts, edges = np.histogram(self.samples(key) / 1e6, bins=bins)
+        return {"counts": counts.tolist(), "edges_ms": edges.tolist()}
+
+    def dump(self, keys: Optional[List[str]] = None, raw=True) -> dict:
+        """Stats and histograms of every key, plus the raw ns samples with `raw`."""
+        report = {}
+        for key in keys or sorted(self.buffers):
+            report[key] = {**self.stats(key), "histogram": self.histogram(key)}
+            if raw:
+                report[key]["samples_ns"] = self.samples(key).tolist()
+        return report
+
+    def reset(self):
+        with self.lock:
+            self.buffers.clear()
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return 0.0
+    rank = round(q / 100 * len(sorted_values)) - 1
+    return sorted_values[max(0, min(len(sorted_values) - 1, rank))]
+
+
+def resident_memory() -> Optional[int]:
+    """Current resident set size of this process in bytes, None where unknown."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+# Shared by the UI and display code
+profiler = Profiler()
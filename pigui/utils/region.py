@@ -0,0 +1,22 @@
+from typing import List, Optional, Tuple
+
+# (left, top, right, bottom) in pixels, right/bottom exclusive like `Image.crop`
+Region = Tuple[int, int, int, int]
+
+
+def union_regions(regions: List[Region]) -> Optional[Region]:
+    if not regions:
+        return None
+    return (
+        min(r[0] for r in regions),
+        min(r[1] for r in regions),
+        max(r[2] for r in regions),
+        max(r[3] for r in regions),
+    )
+
+
+def intersect_regions(a: Region, b: Region) -> Optional[Region]:
+    region = (max(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), min(a[3], b[3]))
+    if region[0] >= region[2] or region[1] >= region[3]:
+        return None
+    return region
@@ -0,0 +1,52 @@
+from typing import Optional
+import numpy as np
+from pigui.utils.constants import screen_height, screen_width
+
+
+class Sprite:
+    """A 1-bit bitmap drawn with bitmask operations.
+
+    `pixels` are OR-ed onto the target. Where `mask` is set, the target is first
+    cleared by AND-ing it with the precomputed inverse of the mask, so an opaque
+    sprite hides whatever is under it while a sprite without a mask only adds pixels.
+    """
+
+    def __init__(self, pixels: np.ndarray, mask: Optional[np.ndarray] = None):
+        self.pixels = np.ascontiguousarray(pixels, dtype=bool)
+        self.keep = None if mask is None else ~np.asarray(mask, dtype=bool)
+        self.height, self.width = self.pixels.shape
+
+    @classmethod
+    def opaque(cls, pixels: np.ndarray) -> "Sprite":
+        """Sprite that covers its whole rectangle, background included."""
+        pixels = np.asarray(pixels, dtype=bool)
+        return cls(pixels, np.ones_like(pixels))
+
+
+class FrameBuffer:
+    """A preallocated (height, width) bool framebuffer that sprites are blitted into.
+
+    Clearing and blitting write in place, so a frame drawn into it allocates no
+    pixel buffers and `pixels` can go to the display packer as is.
+    """
+
+    def __init__(self, width=screen_width, height=screen_height, background=False):
+        self.width = width
+        self.height = height
+        self.background = background
+        self.pixels = np.full((height, width), background, dtype=bool)
+
+    def clear(self):
+        self.pixels.fill(self.background)
+
+    def blit(self, sprite: Sprite, x: int, y: int):
+        """Draw `sprite` with its top left corner at `(x, y)`, clipped to the buffer."""
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + sprite.width, self.width), min(y + sprite.height, self.height)
+        if x0 >= x1 or y0 >= y1:
+            return
+        target = self.pixels[y0:y1, x0:x1]
+        source = (slice(y0 - y, y1 - y), slice(x0 - x, x1 - x))
+        if sprite.keep is not None:
+            np.logical_and(target, sprite.keep[source], out=target)
+        np.logical_or(target, sprite.pixels[source], out=target)
@@ -0,0 +1,118 @@
+"""Cold start profile: import time breakdown and time to first frame.
+
+    python -m pigui.utils.startup main:build_document
+    python -m pigui.utils.startup --fake main:build_document
+
+The target, a `module:function` returning a `Document`, is started in a fresh
+interpreter with `-X importtime`, built, and rendered once. With `--fake` it is
+built on the fake display and controller so it runs off-device. Times are
+`time.monotonic()` readings, shared by both processes, relative to the launch.
+"""
+
+import argparse
+import importlib
+import json
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+CHILD_FLAG = "--child"
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """Modules from `-X importtime` output, slowest cumulative first, times in ms."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # header
+        modules.append(
+            {
+                "module": fields[2].strip(),
+                "self_ms": int(fields[0]) / 1000,
+                "cumulative_ms": int(fields[1]) / 1000,
+                # Nesting depth, top level imports have none
+                "depth": (len(fields[2]) - len(fields[2].lstrip()) - 1) // 2,
+            }
+        )
+    return sorted(modules, key=lambda m: m["cumulative_ms"], reverse=True)
+
+
+def profile(target: str, fake=False, top=25) -> dict:
+    """Start `target` in a new interpreter and time each phase up to its first frame."""
+    command = [
+        sys.executable,
+        "-X",
+        "importtime",
+        "-m",
+        "pigui.utils.startup",
+        CHILD_FLAG,
+        target,
+    ]
+    if fake:
+        command.append("--fake")
+    launched = time.monotonic()
+    child = subprocess.run(command, capture_output=True, text=True, check=True)
+    # The child's marks are the last line of its output
+    marks = json.loads(child.stdout.strip().splitlines()[-1])
+
+    modules = parse_importtime(child.stderr)
+    top_level = [m for m in modules if m["depth"] == 0]
+    return {
+        "target": target,
+        "time_to_first_frame_s": marks["first_frame"] - launched,
+        "phases_s": {
+            "interpreter": marks["started"] - launched,
+            "imports": marks["imported"] - marks["started"],
+            "build": marks["built"] - marks["imported"],
+            "first_render": marks["first_frame"] - marks["built"],
+        },
+        # GPIO should wait until after the first frame
+        "controller_before_first_frame": marks["controller"] is not None
+        and marks["controller"] <= marks["first_frame"],
+        "import_total_ms": sum(m["cumulative_ms"] for m in top_level),
+        "slowest_imports": modules[:top],
+    }
+
+
+def run_child(target: str, fake: bool):
+    started = time.monotonic()
+    module_name, function_name = target.split(":")
+    build = getattr(importlib.import_module(module_name), function_name)
+    kwargs = {}
+    if fake:
+        from pigui.hardware.fake import FakeController, FakeDisplay
+
+        kwargs = {"displayer": FakeDisplay(), "controller": FakeController()}
+    imported = time.monotonic()
+    document = build(**kwargs)
+    built = time.monotonic()
+    document.render()
+    marks = {
+        "started": started,
+        "imported": imported,
+        "built": built,
+        "first_frame": document.first_frame_time or time.monotonic(),
+        "controller": document.controller_time,
+    }
+    print(json.dumps(marks))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("target", help="module:function returning a Document")
+    parser.add_argument("--fake", action="store_true", help="Use fake hardware")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument(CHILD_FLAG, action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_child(args.target, args.fake)
+    else:
+        print(json.dumps(profile(args.target, args.fake, args.top), indent=2))
+
+
+if __name__ == "__main__":
+    main()
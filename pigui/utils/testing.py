@@ -1,6 +1,13 @@
+import random
 import time
-from typing import Union
+from threading import Event, Thread
+from typing import Dict, Optional, Union
+import numpy as np
+from PIL import Image
+from pigui.hardware.camera import DITHER_MODES, ImageProcessor
+from pigui.hardware.display import Display, pack_pages
 from pigui.ui import Component, Frame, Document
+from pigui.utils.latency import latency_tracer
 
 
 def measure_event_time(event_func):
@@ -20,6 +27,52 @@ def measure_event_time(event_func):
             return reaction_time
 
 
+def measure_latency(
+    events=100,
+    inputs=(("joystick", "on_right"), ("joystick", "on_up")),
+    interval=0.2,
+    bus_speed: Optional[int] = 400_000,
+    seed=0,
+) -> Dict[str, dict]:
+    """Input-to-photon latency of the menu on fake hardware, without a Pi.
+
+    Clicks `events` random `(controller, event)` pairs from `inputs`, on average
+    `interval` seconds apart, while the document renders at its target frame rate,
+    and returns the per event type report of `latency_tracer`. `bus_speed` (bits/s)
+    emulates the I2C transfer time.
+    """
+    from pigui.components.menu import Menu
+    from pigui.hardware.fake import FakeController, FakeDisplay
+
+    document = Document(
+        displayer=FakeDisplay(bus_speed=bus_speed), controller=FakeController()
+    )
+    frame = Frame([Menu(document)], frame_name="menu")
+    document.pack_frame("menu", frame)
+    latency_tracer.reset()
+
+    stop = Event()
+
+    def render_loop():
+        while not stop.is_set():
+            document.scheduler.begin_frame()
+            document.render()
+            document.scheduler.end_frame()
+
+    thread = Thread(target=render_loop, daemon=True)
+    thread.start()
+    rng = random.Random(seed)
+    for _ in range(events):
+        time.sleep(rng.uniform(0, 2 * interval))
+        document.controller.click(*rng.choice(inputs))
+    # Let the last events reach the display
+    time.sleep(0.2)
+    stop.set()
+    thread.join()
+    document.remove_frame_event_listeners(frame)
+    return latency_tracer.report()
+
+
 def measure_fps(object: Union[Component, Frame, Document], sleep=0):
     frames = 0
     start_time = time.time()
@@ -34,3 +87,59 @@ def measure_fps(object: Union[Component, Frame, Document], sleep=0):
             start_time = time.time()
         if sleep:
             time.sleep(sleep)
+
+
+def benchmark_packing(display: Display, img: Optional[Image.Image] = None, n=100):
+    """Compare the driver's per-pixel `image()` against the vectorized `pack_pages`.
+    Only the framebuffer packing is timed, nothing is pushed over I2C.
+    """
+    if img is None:
+        img = Image.fromarray(np.random.rand(64, 128) > 0.5)
+
+    start_time = time.perf_counter()
+    for _ in range(n):
+        display.display.image(img)
+    driver_ms = (time.perf_counter() - start_time) / n * 1000
+    driver_bytes = bytes(display.framebuffer)
+
+    start_time = time.perf_counter()
+    for _ in range(n):
+        pack_pages(img, out=display.page_buffer)
+    packed_ms = (time.perf_counter() - start_time) / n * 1000
+    assert bytes(display.framebuffer) == driver_bytes, "Packed buffers differ."
+
+    pixels = np.asarray(img, dtype=bool)
+    start_time = time.perf_counter()
+    for _ in range(n):
+        pack_pages(pixels, out=display.page_buffer)
+    array_ms = (time.perf_counter() - start_time) / n * 1000
+
+    print(f"display.image(): {driver_ms:.3f} ms/frame")
+    print(f"pack_pages(Image): {packed_ms:.3f} ms/frame")
+    print(f"pack_pages(ndarray): {array_ms:.3f} ms/frame")
+    return {"image": driver_ms, "pack_image": packed_ms, "pack_array": array_ms}
+
+
+def benchmark_dither(luma: Optional[np.ndarray] = None, n=100):
+    """Time each `ImageProcessor.dither` mode against the old PIL preview conversion
+    of a full BGR frame.
+    """
+    if luma is None:
+        luma = np.tile(np.linspace(0, 255, 128, dtype=np.uint8), (64, 1))
+    bgr = np.repeat(luma[:, :, None], 3, axis=2)
+
+    results = {}
+    start_time = time.perf_counter()
+    for _ in range(n):
+        ImageProcessor.load_img(bgr)
+    results["pil_bgr"] = (time.perf_counter() - start_time) / n * 1000
+
+    for mode in DITHER_MODES:
+        start_time = time.perf_counter()
+        for _ in range(n):
+            ImageProcessor.dither(luma, mode)
+        results[mode] = (time.perf_counter() - start_time) / n * 1000
+
+    for name, ms in results.items():
+        print(f"{name}: {ms:.3f} ms/frame")
+    return results
@@ -1,5 +1,10 @@
-from typing import List
+import string
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
 from pigui.utils.constants import *
+from pigui.utils.sprite import FrameBuffer, Sprite
 
 
 def format_text(input_string: str, prev_line="") -> List[str]:
@@ -43,3 +48,174 @@ def format_tokens(tokens: str, prev_line="") -> List[str]:
     if prev_line:
         lines.append(prev_line)
     return lines
+
+
+# (mask, (left, top) offset from the pen position, advance)
+Glyph = Tuple[Optional[Image.Image], Tuple[int, int], float]
+
+
+class GlyphAtlas:
+    """Pre-rasterized 1-bit glyphs of one font.
+
+    Each glyph is rasterized through FreeType once and then blitted with
+    `Image.paste`, or as a `Sprite` into a `FrameBuffer`. Kerning is applied from a
+    per-pair cache so the result lines up with `ImageDraw.text`.
+
+    `ImageDraw.text` places glyphs by their hinted bitmaps but offsets the line by
+    its outline bbox, and the two can differ by a pixel (e.g. "V" at size 10, or "~"
+    vertically). Each glyph's in-line position is measured once by `origin`, and
+    lines are shifted by the same bbox difference.
+    """
+
+    def __init__(
+        self,
+        font: ImageFont.ImageFont,
+        chars=string.ascii_letters + string.digits + string.punctuation + " ",
+    ):
+        self.font = font
+        self.glyphs: Dict[str, Glyph] = {}
+        self.kerning: Dict[str, float] = {}
+        self.origins: Dict[str, Tuple[int, int]] = {}
+        self.sprites: Dict[str, Optional[Sprite]] = {}
+        # Same spacing `ImageDraw.multiline_text` uses between lines
+        self.line_height = self.font.getbbox("A", mode="1")[3] + 4
+        for char in chars:
+            self.glyph(char)
+
+    def glyph(self, char: str) -> Glyph:
+        """Return `(mask, (left, top), advance)` for `char`, rasterizing it on first use."""
+        if char not in self.glyphs:
+            left, top, right, bottom = self.font.getbbox(char, mode="1")
+            mask = None
+            if right > left and bottom > top:
+                mask = Image.new("1", (right - left, bottom - top))
+                ImageDraw.Draw(mask).text((-left, -top), char, font=self.font, fill=255)
+            self.glyphs[char] = (mask, (left, top), self.font.getlength(char, mode="1"))
+        return self.glyphs[char]
+
+    def origin(self, char: str) -> Tuple[int, int]:
+        """Top left of `char`'s mask relative to the pen within a line."""
+        if char not in self.origins:
+            mask, (left, top), _ = self.glyph(char)
+            self.origins[char] = (left, top)
+            inked = mask.getbbox() if mask else None
+            if inked:
+                # Draw it well clear of a full height glyph and see where it lands
+                prefix = "|   "
+                pen = round(
+                    self.font.getlength(prefix + char, mode="1")
+                    - self.font.getlength(char, mode="1")
+                )
+                pad = 8
+                reference = Image.new(
+                    "1", (2 * pad + pen + mask.width, top + mask.height + pad)
+                )
+                ImageDraw.Draw(reference).text(
+                    (pad, 0), prefix + char, font=self.font, fill=255
+                )
+                clear = pad + round(self.font.getlength("|", mode="1")) + 1
+                placed = reference.crop((clear, 0) + reference.size).getbbox()
+                if placed:
+                    self.origins[char] = (
+                        placed[0] + clear - inked[0] - pad - pen,
+                        placed[1] - inked[1],
+                    )
+        return self.origins[char]
+
+    def sprite(self, char: str) -> Optional[Sprite]:
+        if char not in self.sprites:
+            mask = self.glyph(char)[0]
+            self.sprites[char] = Sprite(np.asarray(mask)) if mask else None
+        return self.sprites[char]
+
+    def kern(self, pair: str) -> float:
+        if pair not in self.kerning:
+            self.kerning[pair] = (
+                self.font.getlength(pair, mode="1")
+                - self.font.getlength(pair[0], mode="1")
+                - self.font.getlength(pair[1], mode="1")
+            )
+        return self.kerning[pair]
+
+    def layout(self, xy: Tuple[int, int], text: str):
+        """Yield `(char, (x, y))` of every glyph in `text`, `xy` being the top left."""
+        x, y = xy
+        for line in text.split("\n"):
+            yield from self.layout_line((x, y), line)
+            y += self.line_height
+
+    def layout_line(self, xy: Tuple[int, int], line: str):
+        x, y = xy
+        pens = []
+        prev_char = None
+        for char in line:
+            if prev_char:
+                x += self.kern(prev_char + char)
+            pens.append(round(x))
+            x += self.glyph(char)[2]
+            prev_char = char
+
+        # `ImageDraw.text` offsets the line by its bbox, but places glyphs by origin
+        inked = [(pen, char) for pen, char in zip(pens, line) if self.glyph(char)[0]]
+        if not inked:
+            return
+        shift_x = min(pen + self.glyph(char)[1][0] for pen, char in inked) - min(
+            pen + self.origin(char)[0] for pen, char in inked
+        )
+        shift_y = min(self.glyph(char)[1][1] for _, char in inked) - min(
+            self.origin(char)[1] for _, char in inked
+        )
+        for pen, char in inked:
+            origin_x, origin_y = self.origin(char)
+            yield char, (pen + origin_x + shift_x, y + origin_y + shift_y)
+
+    def draw(self, image: Image.Image, xy: Tuple[int, int], text: str, fill=255):
+        for char, position in self.layout(xy, text):
+            mask = self.glyph(char)[0]
+            if mask:
+                image.paste(fill, position, mask)
+
+    def blit(self, framebuffer: FrameBuffer, xy: Tuple[int, int], text: str):
+        for char, (x, y) in self.layout(xy, text):
+            sprite = self.sprite(char)
+            if sprite:
+                framebuffer.blit(sprite, x, y)
+
+
+_atlases: Dict[tuple, GlyphAtlas] = {}
+
+
+def get_atlas(font: Optional[ImageFont.ImageFont] = None) -> GlyphAtlas:
+    """Glyph atlas for `font` (PIL's default font if None), built once per face and size."""
+    if font is None:
+        font = default_font()
+    key = (font.path, font.size) if hasattr(font, "path") else (id(font),)
+    if key not in _atlases:
+        _atlases[key] = GlyphAtlas(font)
+    return _atlases[key]
+
+
+@lru_cache(maxsize=None)
+def default_font() -> ImageFont.ImageFont:
+    return ImageFont.load_default()
+
+
+def draw_text(
+    image: Image.Image,
+    xy: Tuple[int, int],
+    text: str,
+    font: Optional[ImageFont.ImageFont] = None,
+    fill=255,
+):
+    """Drop-in for `ImageDraw.text` on mode "1" images using cached glyph bitmaps."""
+    get_atlas(font).draw(image, xy, text, fill)
+
+
+def blit_text(
+    framebuffer: FrameBuffer,
+    xy: Tuple[int, int],
+    text: str,
+    font: Optional[ImageFont.ImageFont] = None,
+):
+    """`draw_text` into a `FrameBuffer`, OR-ing set glyph pixels."""
+    get_atlas(font).blit(framebuffer, xy, text)
@@ -0,0 +1,123 @@
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from pigui.utils.sprite import FrameBuffer
+
+
+class TileAtlas:
+    """Equally sized 1-bit tiles, bit-packed into one (n_tiles, bytes_per_tile) array.
+
+    Tile 0 is always the empty tile, so a level can leave cells blank.
+    """
+
+    def __init__(self, tiles: Sequence[np.ndarray]):
+        tiles = [np.asarray(tile, dtype=bool) for tile in tiles]
+        self.tile_height, self.tile_width = tiles[0].shape
+        if any(tile.shape != tiles[0].shape for tile in tiles):
+            raise ValueError("Tiles must all have the same shape.")
+        tiles.insert(0, np.zeros_like(tiles[0]))
+        self.packed = np.packbits(
+            np.stack(tiles).reshape(len(tiles), -1), axis=1, bitorder="little"
+        )
+
+    def __len__(self):
+        return len(self.packed)
+
+    def unpack(self, indices: np.ndarray) -> np.ndarray:
+        """Pixels of the tiles at `indices`, shape `indices.shape + (height, width)`."""
+        bits = self.tile_height * self.tile_width
+        pixels = np.unpackbits(
+            self.packed[indices], axis=-1, count=bits, bitorder="little"
+        ).view(bool)
+        return pixels.reshape(indices.shape + (self.tile_height, self.tile_width))
+
+
+class TileMap:
+    """A level as a compact (rows, cols) array of indices into a `TileAtlas`.
+
+    Rendering gathers only the tile columns in view and slices out the viewport at
+    pixel precision, so its cost doesn't depend on the level's length. With `wrap`
+    the level repeats horizontally, as for looping backgrounds.
+    """
+
+    def __init__(self, atlas: TileAtlas, tiles: np.ndarray, wrap=False):
+        self.atlas = atlas
+        self.tiles = np.asarray(
+            tiles, dtype=np.uint8 if len(atlas) <= 256 else np.uint16
+        )
+        self.rows, self.cols = self.tiles.shape
+        self.wrap = wrap
+
+    @classmethod
+    def from_strings(
+        cls, atlas: TileAtlas, rows: List[str], legend: Dict[str, int], wrap=False
+    ) -> "TileMap":
+        """Build a level from text, one string per tile row. Characters missing from
+        `legend` are empty tiles.
+        """
+        cols = max(len(row) for row in rows)
+        tiles = np.zeros((len(rows), cols), dtype=np.uint16)
+        for r, row in enumerate(rows):
+            for c, char in enumerate(row):
+                tiles[r, c] = legend.get(char, 0)
+        return cls(atlas, tiles, wrap)
+
+    @property
+    def width(self) -> int:
+        """Level width in pixels."""
+        return self.cols * self.atlas.tile_width
+
+    def render(self, framebuffer: FrameBuffer, scroll_x: float, y=0):
+        """OR the part of the level starting `scroll_x` pixels in onto `framebuffer`,
+        with the top of the level at `y`.
+        """
+        tile_w, tile_h = self.atlas.tile_width, self.atlas.tile_height
+        x = math.floor(scroll_x)
+        if self.wrap:
+            x %= self.width
+        first_col, sub_x = divmod(x, tile_w)
+        cols = np.arange(
+            first_col, first_col + -(-(framebuffer.width + sub_x) // tile_w)
+        )
+
+        # Only the tile rows that land on the framebuffer
+        row_start = max(0, -y // tile_h)
+        row_end = min(self.rows, -(-(framebuffer.height - y) // tile_h))
+        if row_start >= row_end:
+            return
+        if self.wrap:
+            indices = self.tiles[row_start:row_end, cols % self.cols]
+        else:
+            in_level = (cols >= 0) & (cols < self.cols)
+            indices = self.tiles[row_start:row_end, np.clip(cols, 0, self.cols - 1)]
+            indices[:, ~in_level] = 0
+
+        # (rows, cols, h, w) tiles -> one strip of pixel rows, then the viewport
+        tiles = self.atlas.unpack(indices)
+        strip = tiles.transpose(0, 2, 1, 3).reshape(
+            tiles.shape[0] * tile_h, tiles.shape[1] * tile_w
+        )[:, sub_x : sub_x + framebuffer.width]
+
+        top = y + row_start * tile_h
+        strip = strip[max(0, -top) : framebuffer.height - top]
+        top = max(0, top)
+        target = framebuffer.pixels[top : top + strip.shape[0], : strip.shape[1]]
+        np.logical_or(target, strip, out=target)
+
+
+class Parallax:
+    """Tile map layers scrolling at different rates, drawn back to front.
+
+    Each layer is `(tilemap, factor, y)`: it scrolls `factor` pixels per pixel of
+    camera movement, so distant layers use factors below 1.
+    """
+
+    def __init__(self, layers: Optional[List[Tuple[TileMap, float, int]]] = None):
+        self.layers = layers or []
+
+    def add_layer(self, tilemap: TileMap, factor=1.0, y=0):
+        self.layers.append((tilemap, factor, y))
+
+    def render(self, framebuffer: FrameBuffer, camera_x: float):
+        for tilemap, factor, y in self.layers:
+            tilemap.render(framebuffer, camera_x * factor, y)
@@ -0,0 +1,53 @@
+import time
+from pigui.hardware.controller import EDGE_DEBOUNCE, InputDispatcher
+from pigui.hardware.gpio import SimulatedGPIO
+
+PIN = 17
+
+
+class Button:
+    name = "button"
+
+
+def make_dispatcher():
+    backend = SimulatedGPIO()
+    dispatcher = InputDispatcher(backend)
+    button = Button()
+    backend.setup_input(PIN)
+    dispatcher.register_pin(PIN, button, "on_press")
+    edges = []
+    for edge in ["press", "release"]:
+        dispatcher.subscribe(button, "on_press", edge, lambda e: edges.append(e.edge))
+    return backend, edges
+
+
+def settle():
+    # Past the debounce window, with time for the dispatcher to read pins back
+    time.sleep(EDGE_DEBOUNCE * 5)
+
+
+def test_bounce_burst_gives_one_press():
+    backend, edges = make_dispatcher()
+    for _ in range(3):
+        backend.press(PIN)
+        backend.release(PIN)
+    backend.press(PIN)
+    settle()
+    assert edges == ["press"]
+
+
+def test_release_inside_bounces_is_dispatched_after_window():
+    backend, edges = make_dispatcher()
+    backend.press(PIN)
+    backend.release(PIN)
+    settle()
+    assert edges == ["press", "release"]
+
+
+def test_press_after_swallowed_release():
+    backend, edges = make_dispatcher()
+    backend.click(PIN)
+    settle()
+    backend.click(PIN)
+    settle()
+    assert edges == ["press", "release", "press", "release"]
@@ -0,0 +1,28 @@
+import pigui.ui
+from pigui.hardware.fake import FakeController, FakeDisplay
+from pigui.ui import Document, Frame
+
+
+def make_document(**kwargs):
+    document = Document(displayer=FakeDisplay(), controller=FakeController(), **kwargs)
+    document.pack_frame("menu", Frame())
+    for name in ["a", "b", "c"]:
+        document.pack_frame(name, lambda: Frame())
+        document.get_frame(name)
+    return document
+
+
+def test_over_budget_evicts_one_frame_per_pass(monkeypatch):
+    monkeypatch.setattr(pigui.ui, "resident_memory", lambda: 2)
+    document = make_document(frame_idle_timeout=None, memory_budget=1)
+
+    document.evict_idle_frames()
+    assert set(document.frames) == {"menu", "b", "c"}
+    document.evict_idle_frames()
+    assert set(document.frames) == {"menu", "c"}
+
+
+def test_idle_frames_are_all_evicted():
+    document = make_document(frame_idle_timeout=0)
+    document.evict_idle_frames()
+    assert set(document.frames) == {"menu"}
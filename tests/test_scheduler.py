@@ -0,0 +1,40 @@
+import threading
+import time
+from pigui.ui.scheduler import EventScheduler
+
+
+def test_blocking_job_does_not_delay_others():
+    scheduler = EventScheduler()
+    release = threading.Event()
+    fast_runs = []
+    slow_runs = []
+
+    def slow():
+        slow_runs.append(time.monotonic())
+        release.wait(1)
+
+    scheduler.schedule(slow, 0.01, blocking=True)
+    scheduler.schedule(lambda: fast_runs.append(time.monotonic()), 0.01)
+    time.sleep(0.3)
+    release.set()
+
+    # The slow job was still running, so its later runs were skipped
+    assert len(slow_runs) == 1
+    assert len(fast_runs) >= 10
+
+
+def test_blocking_job_runs_off_scheduler_thread():
+    scheduler = EventScheduler()
+    threads = {}
+    done = threading.Event()
+
+    def record(name):
+        threads[name] = threading.current_thread()
+        if len(threads) == 2:
+            done.set()
+
+    scheduler.schedule(lambda: record("blocking"), blocking=True)
+    scheduler.schedule(lambda: record("plain"))
+    assert done.wait(1)
+    assert threads["plain"] is scheduler.thread
+    assert threads["blocking"] is not scheduler.thread
@@ -0,0 +1,22 @@
+import main
+from pigui.hardware.fake import FakeController, FakeDisplay
+
+
+def test_build_document_opens_no_hardware():
+    document = main.build_document()
+    assert document._displayer is None
+    assert document._controller is None
+
+
+def test_controller_waits_for_first_frame():
+    document = main.build_document(displayer=FakeDisplay(), controller=FakeController())
+    document.render()
+    assert document.first_frame_time is not None
+    assert document.controller_time is None
+
+    # Listeners start, and look up their controllers, from the next frame on
+    document.render()
+    try:
+        assert document.controller_time >= document.first_frame_time
+    finally:
+        document.remove_frame_event_listeners(document.get_frame("menu"))